@@ -0,0 +1,139 @@
+from drilling_problem import DrillingRobotProblem, expand_goal
+from search import SEARCHES, Result, node_from_actions, shortest_path_tree
+from utils import lazy_import
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+np = lazy_import("numpy")
+
+
+def solve_batch(grid, queries, problem=None):
+    """Solve many (start, goal) queries on a single map and return a list of
+    Results in the same order as queries. The map is compiled once for the
+    whole batch, and queries sharing a start are answered from one
+    shortest-path tree (see search.shortest_path_tree), so every goal
+    reached from the same start costs a single Dijkstra search. A goal may
+    also be a list of goals, answered by the nearest of them. Pass a
+    DrillingRobotProblem built on grid as problem to reuse its compiled
+    tables across batches; its own start and goal are ignored."""
+    queries = [(tuple(start), tuple(goal)) for start, goal in queries]
+    if not queries:
+        return []
+    if problem is None:
+        problem = DrillingRobotProblem(grid, *queries[0])
+    problem.compile()
+
+    by_start = {}
+    for index, (start, goal) in enumerate(queries):
+        by_start.setdefault(start, []).append(index)
+
+    results = [None] * len(queries)
+    for start, indices in by_start.items():
+        goal_sets = [expand_goal(queries[index][1]) for index in indices]
+        for index, result in zip(
+            indices, shortest_path_tree(problem, start, goal_sets)
+        ):
+            results[index] = result
+    return results
+
+
+# what a solve_parallel worker attached to: the shared memory blocks (kept
+# open while the views below use them), the grid and the compiled tables
+_SHARED = {}
+
+
+def solve_parallel(
+    grid, queries, workers=None, heuristic="euclidean", compiled=False
+):
+    """Solve (start, goal) or (start, goal, algorithm) queries on a single
+    map in a pool of worker processes and return their Results in the same
+    order as queries (algorithm is a key of search.SEARCHES, "astar" by
+    default). The hardness array is put in shared memory once, and with
+    compiled=True so are the transition tables of DrillingRobotProblem
+    .compile; workers attach to them when they start, so adding workers
+    copies neither the map nor the tables. Workers send back only the
+    actions and counts of each Result; its Node path is rebuilt here."""
+    jobs = []
+    for query in queries:
+        start, goal, algorithm = (*query, "astar")[:3]
+        if algorithm not in SEARCHES:
+            raise ValueError("Unknown algorithm: {}".format(algorithm))
+        jobs.append((tuple(start), goal, algorithm, heuristic))
+    if not jobs:
+        return []
+
+    cells = np.asarray(grid)
+    if cells.dtype != np.uint8 and 0 <= cells.min() and cells.max() <= 255:
+        cells = cells.astype(np.uint8)  # one byte per cell is enough
+    blocks = []
+    try:
+        grid_spec = _share(cells, blocks)
+        table_specs = None
+        if compiled:
+            problem = DrillingRobotProblem(cells, *jobs[0][:2], compiled=True)
+            table_specs = (
+                _share(problem.move_table, blocks),
+                _share(problem.move_cost_table, blocks),
+            )
+            del problem
+        with ProcessPoolExecutor(
+            workers, initializer=_attach_map, initargs=(grid_spec, table_specs)
+        ) as pool:
+            chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+            answers = list(pool.map(_solve_job, jobs, chunksize=chunksize))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    # replaying actions does not depend on the goal: one problem serves all
+    replay = DrillingRobotProblem(grid, *jobs[0][:2])
+    results = []
+    for (start, *_), (actions, explored, frontier) in zip(jobs, answers):
+        if actions is None:
+            results.append(Result(solution=None, explored=explored, frontier=frontier))
+        else:
+            node = node_from_actions(replay, actions, start)
+            results.append(
+                Result(
+                    solution=node, explored=explored, frontier=frontier, last_node=node
+                )
+            )
+    return results
+
+
+def _share(values, blocks):
+    """Copy a NumPy array into a new shared memory block (appended to
+    blocks) and return what a worker needs to attach to it."""
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+    return block.name, values.shape, values.dtype.str
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    # pool workers share the parent's resource tracker, so attaching does
+    # not make the block outlive (or die with) this worker
+    block = shared_memory.SharedMemory(name=name)
+    _SHARED.setdefault("blocks", []).append(block)
+    return np.ndarray(shape, dtype, buffer=block.buf)
+
+
+def _attach_map(grid_spec, table_specs):
+    """Worker initializer of solve_parallel."""
+    _SHARED["grid"] = _attach(grid_spec)
+    _SHARED["tables"] = None
+    if table_specs is not None:
+        _SHARED["tables"] = [_attach(spec) for spec in table_specs]
+
+
+def _solve_job(job):
+    start, goal, algorithm, heuristic = job
+    problem = DrillingRobotProblem(_SHARED["grid"], start, goal, heuristic=heuristic)
+    if _SHARED["tables"] is not None:
+        problem.use_tables(*_SHARED["tables"])
+    result = SEARCHES[algorithm](problem)
+    actions = None if result.solution is None else result.solution.solution()
+    return actions, result.explored, result.frontier
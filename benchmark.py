@@ -0,0 +1,215 @@
+"""Benchmark suite for the drilling robot searches.
+
+Runs each algorithm on seeded random maps of several sizes and records
+median/p95 wall time, node throughput and peak memory. It writes the
+numbers as JSON and can compare them against a stored baseline, flagging
+regressions above a threshold:
+
+    python benchmark.py --sizes 3 10 50 100 --output bench.json
+    python benchmark.py --baseline bench.json --threshold 0.2
+"""
+
+from drilling_problem import DrillingRobotProblem
+from utils import generate_grid_array, TERRAINS
+from search import SEARCHES
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+DEFAULT_SIZES = [3, 10, 50, 100]
+FULL_SIZES = [3, 10, 50, 100, 250, 500, 1000]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def make_problem(n, seed, repeat, terrain="uniform"):
+    grid, start, goal = generate_grid_array(
+        n, n, seed=f"{seed}:{n}:{repeat}", terrain=terrain
+    )
+    return DrillingRobotProblem(grid=grid, start=start, goal=goal)
+
+
+def benchmark_case(
+    algorithm, n, repeats, seed, measure_memory=True, terrain="uniform"
+):
+    """Time algorithm on `repeats` seeded n x n maps and return its metrics."""
+    search = SEARCHES[algorithm]
+    latencies, explored, costs = [], [], []
+    for repeat in range(repeats):
+        problem = make_problem(n, seed, repeat, terrain)
+        started = time.perf_counter()
+        result = search(problem)
+        latencies.append(time.perf_counter() - started)
+        explored.append(result.explored)
+        costs.append(result.solution.path_cost if result.solution else None)
+
+    peak_bytes = None
+    if measure_memory:
+        # separate run: tracing allocations distorts the timings above
+        problem = make_problem(n, seed, 0, terrain)
+        tracemalloc.start()
+        search(problem)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    total_time = sum(latencies)
+    return {
+        "algorithm": algorithm,
+        "size": n,
+        "repeats": repeats,
+        "median_s": statistics.median(latencies),
+        "p95_s": percentile(latencies, 0.95),
+        "mean_explored": statistics.mean(explored),
+        "nodes_per_s": sum(explored) / total_time if total_time else None,
+        "peak_bytes": peak_bytes,
+        "costs": costs,
+    }
+
+
+def run_benchmarks(
+    algorithms, sizes, repeats, seed, measure_memory=True, terrain="uniform"
+):
+    results = []
+    for n in sizes:
+        for algorithm in algorithms:
+            case = benchmark_case(
+                algorithm, n, repeats, seed, measure_memory, terrain
+            )
+            print_case(case)
+            results.append(case)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "terrain": terrain,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(report, baseline, threshold, min_time=0.001):
+    """Return a list of regression messages: cases whose median or p95 time
+    or peak memory grew, or whose throughput dropped, by more than
+    threshold (a fraction). Timings of cases whose median stays under
+    min_time seconds are too noisy to judge and are skipped; peak memory is
+    compared whenever both runs measured it."""
+    previous = {
+        (case["algorithm"], case["size"]): case for case in baseline["results"]
+    }
+    regressions = []
+    for case in report["results"]:
+        old = previous.get((case["algorithm"], case["size"]))
+        if old is None:
+            continue
+        if old.get("peak_bytes") and case["peak_bytes"] is not None:
+            if case["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+                regressions.append(
+                    f"{case['algorithm']} {case['size']}x{case['size']}: peak_bytes "
+                    f"{old['peak_bytes']} -> {case['peak_bytes']}"
+                )
+        if max(old["median_s"], case["median_s"]) < min_time:
+            continue
+        for metric in ("median_s", "p95_s"):
+            if old[metric] and case[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    f"{case['algorithm']} {case['size']}x{case['size']}: {metric} "
+                    f"{old[metric]:.6f} -> {case[metric]:.6f}"
+                )
+        if old["nodes_per_s"] and case["nodes_per_s"] is not None:
+            if case["nodes_per_s"] < old["nodes_per_s"] / (1 + threshold):
+                regressions.append(
+                    f"{case['algorithm']} {case['size']}x{case['size']}: nodes_per_s "
+                    f"{old['nodes_per_s']:.0f} -> {case['nodes_per_s']:.0f}"
+                )
+    return regressions
+
+
+def print_case(case):
+    memory = (
+        f"{case['peak_bytes'] / 1e6:.1f}MB" if case["peak_bytes"] is not None else "-"
+    )
+    throughput = case["nodes_per_s"] or 0
+    print(
+        f"{case['algorithm']:<13} {case['size']:>5}x{case['size']:<5} "
+        f"median {case['median_s'] * 1e3:10.2f}ms  p95 {case['p95_s'] * 1e3:10.2f}ms  "
+        f"{throughput:12.0f} nodes/s  peak {memory}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--full", action="store_true", help="run every size from 3x3 to 1000x1000"
+    )
+    parser.add_argument(
+        "--algorithms", nargs="+", choices=sorted(SEARCHES), default=list(SEARCHES)
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--terrain",
+        choices=TERRAINS,
+        default="uniform",
+        help="hardness model of the generated maps (default uniform)",
+    )
+    parser.add_argument("--no-memory", action="store_true", help="skip peak memory")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown flagged as a regression (default 0.2)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.001,
+        help="ignore cases faster than this many seconds (default 0.001)",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = FULL_SIZES if args.full else args.sizes
+    report = run_benchmarks(
+        args.algorithms,
+        sizes,
+        args.repeats,
+        args.seed,
+        not args.no_memory,
+        args.terrain,
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(
+            report, baseline, args.threshold, args.min_time
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for message in regressions:
+                print("  " + message)
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
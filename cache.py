@@ -0,0 +1,117 @@
+from search import Result, node_from_actions
+from utils import LRUCache
+import sqlite3
+
+# one character per action in stored action sequences
+ACTION_CODES = {"rotate_left": "L", "rotate_right": "R", "move_forward": "F"}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+
+class SolutionCache:
+    """Cache of search results keyed by map content hash, start, goal,
+    heuristic and algorithm name. Entries live in an in-memory LRU of
+    maxsize entries and, if path is given, in a sqlite database at path
+    that is shared across processes and restarts. Only the action sequence
+    and the counts of a Result are stored; a hit replays the actions to
+    rebuild the Node path (with its costs) without searching.
+
+        cache = SolutionCache(path="solutions.sqlite")
+        result = cache.solve(problem, astar_search)
+
+    The key does not include extra search arguments (such as h), so give
+    searches whose results differ different algorithm names."""
+
+    def __init__(self, maxsize=1024, path=None):
+        self.memory = LRUCache(maxsize)
+        self.hits = self.misses = 0
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            with self.connection:
+                columns = [
+                    row[1]
+                    for row in self.connection.execute("PRAGMA table_info(solutions)")
+                ]
+                if columns and "heuristic" not in columns:
+                    # written before the key had the heuristic: entries of
+                    # different heuristics may be mixed up, so start afresh
+                    self.connection.execute("DROP TABLE solutions")
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS solutions ("
+                    " map_key TEXT, start TEXT, goal TEXT, heuristic TEXT,"
+                    " algorithm TEXT, actions TEXT, cost REAL, explored INTEGER,"
+                    " frontier INTEGER,"
+                    " PRIMARY KEY (map_key, start, goal, heuristic, algorithm))"
+                )
+
+    @staticmethod
+    def key(problem, algorithm):
+        return (
+            problem.map_key,
+            ",".join(map(str, problem.initial)),
+            ",".join(map(str, problem.goal)),
+            problem.heuristic,
+            algorithm,
+        )
+
+    def get(self, problem, algorithm):
+        """Return the cached Result of algorithm on problem, or None."""
+        key = self.key(problem, algorithm)
+        entry = self.memory.get(key)
+        if entry is None and self.connection is not None:
+            entry = self.connection.execute(
+                "SELECT actions, cost, explored, frontier FROM solutions"
+                " WHERE map_key = ? AND start = ? AND goal = ? AND heuristic = ?"
+                " AND algorithm = ?",
+                key,
+            ).fetchone()
+            if entry is not None:
+                self.memory[key] = entry
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        actions, _, explored, frontier = entry
+        if actions is None:
+            return Result(solution=None, explored=explored, frontier=frontier)
+        node = node_from_actions(problem, [CODE_ACTIONS[code] for code in actions])
+        return Result(
+            solution=node, explored=explored, frontier=frontier, last_node=node
+        )
+
+    def put(self, problem, algorithm, result):
+        """Store result, the Result of algorithm on problem. Results of
+        searches stopped by a SearchBudget are partial and are not stored."""
+        if result.stopped is not None:
+            return
+        key = self.key(problem, algorithm)
+        if result.solution is None:
+            actions, cost = None, None
+        else:
+            actions = "".join(ACTION_CODES[a] for a in result.solution.solution())
+            cost = result.solution.path_cost
+        entry = (actions, cost, result.explored, result.frontier)
+        self.memory[key] = entry
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO solutions"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + entry,
+                )
+
+    def solve(self, problem, search, *args, algorithm=None, **kwargs):
+        """Return the cached Result of search on problem, running
+        search(problem, *args, **kwargs) and caching its Result on a miss.
+        algorithm names the search in the key (default: its __name__)."""
+        algorithm = algorithm or search.__name__
+        result = self.get(problem, algorithm)
+        if result is None:
+            result = search(problem, *args, **kwargs)
+            self.put(problem, algorithm, result)
+        return result
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -1,6 +1,10 @@
-from utils import euclidean_distance, is_in
+from utils import euclidean_distance, is_in, grid_hash, lazy_import, LRUCache
+from array import array
+import heapq
 import random
 
+np = lazy_import("numpy")
+
 
 class Problem:
     """The abstract class for a formal problem. You should subclass
@@ -65,22 +69,209 @@ class DrillingRobotProblem(Problem):
         (-1, -1),  # 7: Northwest
     ]
 
-    def __init__(self, grid, start, goal):
+    ACTIONS = ["rotate_left", "rotate_right", "move_forward"]
+
+    def __init__(self, grid, start, goal, compiled=False, heuristic="euclidean"):
         self.grid = grid
+        # goal is a single (row, column, orientation) goal or a list of them,
+        # in which case reaching any one of the goals solves the problem
+        self.multiple_goals = is_goal_list(goal)
+        if self.multiple_goals:
+            goal = [tuple(target) for target in goal]
         self.goal = goal
         initial_state = (
             start[0],
             start[1],
             start[2],
         )  # (x, y, orientation_index)
-        self.grid_min_hardness = min(min(row) for row in grid)
+        self.rows = len(grid)
+        self.columns = len(grid[0])
+        if hasattr(grid, "ndim"):  # not isinstance: that would import NumPy
+            # e.g. a memmap from utils.load_binary_map: index it through a
+            # flat memoryview, which yields plain ints without copying
+            self._cells = memoryview(np.ascontiguousarray(grid).reshape(-1))
+            self.grid_min_hardness = int(grid.min())
+        else:
+            self._cells = None
+            self.grid_min_hardness = min(min(row) for row in grid)
+        self.compiled = False
         super().__init__(initial_state, goal)
+        # off-map states would alias real ones once packed into state ids
+        if not self.is_valid_state(self.initial):
+            raise ValueError("Start is not a state on the map: {}".format(start))
+        for target in self.goals():
+            if not self.is_valid_state(target, any_orientation=True):
+                raise ValueError("Goal is not on the map: {}".format(target))
+        self._goal_set = frozenset(self.goal_states())
+        if compiled:
+            self.compile()
+        # "euclidean": straight-line distance * grid_min_hardness (with
+        #   several goals: Chebyshev distance to the nearest goal cell, see
+        #   goal_distance_transform)
+        # "chebyshev": precomputed move and rotation bound, see chebyshev_table
+        # "exact": true cost-to-go, see goal_cost_field
+        self.heuristic = heuristic
+        self._map_key = None
+        if heuristic not in ("euclidean", "chebyshev", "exact"):
+            raise ValueError("Unknown heuristic: {}".format(heuristic))
+        self._build_heuristic_table()
+
+    def hardness(self, row, column):
+        """Cost of moving into cell (row, column)."""
+        if self._cells is not None:
+            return self._cells[row * self.columns + column]
+        return self.grid[row][column]
+
+    def set_hardness(self, row, column, hardness):
+        """Change the hardness of cell (row, column), e.g. when drilling
+        reveals the map was wrong, and update what was derived from the
+        grid: compiled move costs, the map key and heuristic tables.
+        grid_min_hardness is only ever lowered, so heuristics stay
+        admissible without rescanning the whole grid."""
+        self.grid[row][column] = hardness
+        if self._cells is not None:
+            self._cells[row * self.columns + column] = hardness
+        self._map_key = None
+        self.grid_min_hardness = min(self.grid_min_hardness, hardness)
+        if self.compiled:
+            # the moves into the cell: one per orientation, from behind it
+            for orientation in range(8):
+                delta_row, delta_column = self.ORIENTATIONS[orientation]
+                previous = (row - delta_row, column - delta_column, orientation)
+                if self.is_valid_position(previous[0], previous[1]):
+                    state_id = self.state_id(previous)
+                    if hardness > np.iinfo(self.move_cost_table.dtype).max:
+                        # too hard for uint8 costs: widen (and unshare) them
+                        self.use_tables(
+                            self.move_table, self.move_cost_table.astype(np.int64)
+                        )
+                    self._move_costs[state_id] = hardness
+        self._build_heuristic_table()
+
+    def _build_heuristic_table(self):
+        self._heuristic_values = self._goal_distances = None
+        if self.heuristic == "chebyshev":
+            self.heuristic_table = self.chebyshev_table()
+            self._heuristic_values = array("d", self.heuristic_table.tobytes())
+        elif self.heuristic == "exact":
+            self._heuristic_values = _goal_field_values(self)
+            self.heuristic_table = np.frombuffer(self._heuristic_values)
+        elif self.multiple_goals:
+            # one entry per cell rather than per state: 8x less memory
+            distances = self.goal_distance_transform().astype(np.int64)
+            self._goal_distances = array("q", distances.tobytes())
 
     # grid is rectangular, (from the problem statement)
     def is_valid_position(self, row, column):
-        rows = len(self.grid)
-        columns = len(self.grid[0])
-        return 0 <= row < rows and 0 <= column < columns
+        return 0 <= row < self.rows and 0 <= column < self.columns
+
+    def is_valid_state(self, state, any_orientation=False):
+        """True if state is a (row, column, orientation) on the map; with
+        any_orientation, orientation 8 (any, as in goals) is accepted too."""
+        if len(state) != 3:
+            return False
+        row, column, orientation = state
+        return self.is_valid_position(row, column) and (
+            0 <= orientation < 8 or (any_orientation and orientation == 8)
+        )
+
+    @property
+    def map_key(self):
+        """Content hash of the grid, computed once per problem."""
+        if self._map_key is None:
+            self._map_key = grid_hash(self.grid)
+        return self._map_key
+
+    @property
+    def num_states(self):
+        return self.rows * self.columns * len(self.ORIENTATIONS)
+
+    def state_id(self, state):
+        """Pack a (row, column, orientation) state into a single int."""
+        (row, column, orientation) = state
+        return (row * self.columns + column) * 8 + orientation
+
+    def id_state(self, state_id):
+        """Inverse of state_id."""
+        cell, orientation = divmod(state_id, 8)
+        row, column = divmod(cell, self.columns)
+        return (row, column, orientation)
+
+    def compile(self):
+        """Precompute the moves of the whole map. move_table holds, for every
+        state id, the state id reached by move_forward (-1 off the grid) and
+        move_cost_table the hardness paid for it; rotations stay in the cell
+        and cost 1, so they need no table. Ids are int32 and costs uint8
+        whenever they fit, about 5 bytes per state. Once compiled,
+        successors() answers by table lookup."""
+        if self.compiled:
+            return
+        hardness = np.asarray(self.grid)
+        rows, columns = self.rows, self.columns
+        id_type = np.int32 if self.num_states < 2**31 else np.int64
+        if 0 <= hardness.min() and hardness.max() <= 255:
+            cost_type = np.uint8
+        else:
+            cost_type = np.int64
+        moves = np.full((rows, columns, 8), -1, dtype=id_type)
+        costs = np.zeros((rows, columns, 8), dtype=cost_type)
+        cell = np.arange(rows * columns, dtype=id_type).reshape(rows, columns)
+        for orientation, (delta_row, delta_column) in enumerate(self.ORIENTATIONS):
+            # the cells whose neighbour in this direction is on the grid, and
+            # those neighbours
+            source = (
+                slice(max(-delta_row, 0), rows - max(delta_row, 0)),
+                slice(max(-delta_column, 0), columns - max(delta_column, 0)),
+            )
+            target = (
+                slice(max(delta_row, 0), rows + min(delta_row, 0)),
+                slice(max(delta_column, 0), columns + min(delta_column, 0)),
+            )
+            moves[source + (orientation,)] = cell[target] * 8 + orientation
+            costs[source + (orientation,)] = hardness[target]
+        self.use_tables(moves.reshape(-1), costs.reshape(-1))
+
+    def use_tables(self, move_table, move_cost_table):
+        """Adopt tables built by compile(), possibly for another problem on
+        the same grid (e.g. tables kept in shared memory), without copying
+        them. Shared tables stay shared: set_hardness changes them for
+        every user."""
+        self.move_table = move_table
+        self.move_cost_table = move_cost_table
+        # memoryviews index to plain ints, which is much cheaper than
+        # indexing the NumPy tables element by element
+        self._move_ids = memoryview(move_table)
+        self._move_costs = memoryview(move_cost_table)
+        self.compiled = True
+
+    def successors(self, state):
+        """Return (action, next_state, step_cost) for every action applicable
+        in state, in the same order as actions(state)."""
+        if not self.compiled:
+            successors = []
+            for action in self.actions(state):
+                next_state = self.result(state, action)
+                step_cost = self.path_cost(0, state, action, next_state)
+                successors.append((action, next_state, step_cost))
+            return successors
+
+        (row, column, orientation) = state
+        state_id = (row * self.columns + column) * 8 + orientation
+        successors = [
+            ("rotate_left", (row, column, (orientation - 1) % 8), 1),
+            ("rotate_right", (row, column, (orientation + 1) % 8), 1),
+        ]
+        next_id = self._move_ids[state_id]
+        if next_id >= 0:
+            next_row, next_column = divmod(next_id >> 3, self.columns)
+            successors.append(
+                (
+                    "move_forward",
+                    (next_row, next_column, orientation),
+                    self._move_costs[state_id],
+                )
+            )
+        return successors
 
     def actions(self, state):
         (row, column, orientation) = state
@@ -117,29 +308,244 @@ class DrillingRobotProblem(Problem):
             case _:
                 return state
 
-    def goal_test(self, state):
-        row, column, orientation = state
-        goal_row, goal_column, goal_orientation = self.goal
+    def predecessors(self, state):
+        """Return (action, previous_state, step_cost) for every transition
+        that leads into state; the reverse of successors(). A move into a
+        cell costs that cell's hardness, whichever way it is traversed."""
+        (row, column, orientation) = state
+        predecessors = [
+            ("rotate_left", (row, column, (orientation + 1) % 8), 1),
+            ("rotate_right", (row, column, (orientation - 1) % 8), 1),
+        ]
+        delta_row, delta_column = self.ORIENTATIONS[orientation]
+        previous_row, previous_column = row - delta_row, column - delta_column
+        if self.is_valid_position(previous_row, previous_column):
+            predecessors.append(
+                (
+                    "move_forward",
+                    (previous_row, previous_column, orientation),
+                    self.hardness(row, column),
+                )
+            )
+        return predecessors
 
-        if (row, column) != (goal_row, goal_column):
-            return False
-        if goal_orientation == 8:  # 8 means orientation is not relevant
-            return True
-        return orientation == goal_orientation
+    def bidirectional_heuristics(self):
+        """Return consistent (h, h_reverse) functions of a state for
+        bidirectional search: grid_min_hardness times the Chebyshev distance
+        to the (nearest) goal cell and from the start cell respectively."""
+        start_row, start_column, _ = self.initial
+        min_hardness = self.grid_min_hardness
+        if self.multiple_goals:
+            distances = self.goal_distance_transform().ravel().tolist()
+            columns = self.columns
+
+            def h(state):
+                return min_hardness * distances[state[0] * columns + state[1]]
+
+        else:
+            goal_row, goal_column, _ = self.goal
+
+            def h(state):
+                return min_hardness * max(
+                    abs(goal_row - state[0]), abs(goal_column - state[1])
+                )
+
+        def h_reverse(state):
+            return min_hardness * max(
+                abs(start_row - state[0]), abs(start_column - state[1])
+            )
+
+        return h, h_reverse
+
+    def goals(self):
+        """Return the list of goals: [self.goal] unless there are several."""
+        return self.goal if self.multiple_goals else [tuple(self.goal)]
+
+    def goal_sets(self):
+        """Return one list of goal states per goal, in the order of goals()."""
+        return [expand_goal(goal) for goal in self.goals()]
+
+    def goal_states(self):
+        """Return every state that passes goal_test."""
+        return expand_goal(self.goal)
+
+    def goal_test(self, state):
+        # a hashed lookup, however many goals there are
+        return state in self._goal_set
 
     def path_cost(self, c, state1, action, state2):
         # c is the cummulative cost to reach state1
         if action == "move_forward":
             (row, column, _) = state2
             return (
-                c + self.grid[row][column]
+                c + self.hardness(row, column)
             )  # moving into a cell has the cost of that cell
         else:
             return c + 1  # rotate actions have a cost of 1
 
     def h(self, node):
+        if self._heuristic_values is not None:
+            return self._heuristic_values[self.state_id(node.state)]
+
         (row, column, _) = node.state
+        if self._goal_distances is not None:
+            distance = self._goal_distances[row * self.columns + column]
+            return distance * self.grid_min_hardness
         (goal_row, goal_column, _) = self.goal
         euclidean_dist = euclidean_distance((row, column), (goal_row, goal_column))
 
         return euclidean_dist * self.grid_min_hardness
+
+    def chebyshev_table(self):
+        """Return a NumPy array, indexed by state id, with a consistent lower
+        bound on the cost to the goal. Every move costs at least
+        grid_min_hardness and the robot moves in 8 directions, so it needs at
+        least max(|dr|, |dc|) moves. Some move must point towards the goal
+        (positive dot product with the remaining displacement), so the robot
+        has to rotate at least from its orientation to one of those
+        directions, and from there to the goal orientation if one is set.
+        With several goals only the move bound to the nearest goal cell is
+        kept (see goal_distance_transform)."""
+        if self.multiple_goals:
+            moves = self.goal_distance_transform().astype(float).reshape(-1)
+            return np.repeat(self.grid_min_hardness * moves, 8)
+        rows, columns = self.rows, self.columns
+        goal_row, goal_column, goal_orientation = self.goal
+        row, column = np.meshgrid(np.arange(rows), np.arange(columns), indexing="ij")
+        delta_row, delta_column = goal_row - row, goal_column - column
+        moves = np.maximum(np.abs(delta_row), np.abs(delta_column))
+
+        deltas = np.array(self.ORIENTATIONS)
+        towards_goal = (
+            delta_row[..., None] * deltas[:, 0] + delta_column[..., None] * deltas[:, 1]
+        ) > 0  # (rows, columns, direction)
+        orientation = np.arange(8)
+        turns = (orientation[:, None] - orientation[None, :]) % 8
+        turns = np.minimum(turns, 8 - turns)  # rotations between two orientations
+        if goal_orientation == 8:
+            via = turns
+        else:
+            via = turns + turns[:, goal_orientation][None, :]
+
+        rotations = np.empty((rows, columns, 8))
+        for o in range(8):
+            rotations[..., o] = np.where(towards_goal, via[o], 8).min(axis=-1)
+        at_goal = moves == 0
+        if goal_orientation == 8:
+            rotations[at_goal] = 0
+        else:
+            rotations[at_goal] = turns[goal_orientation]
+
+        table = self.grid_min_hardness * moves[..., None] + rotations
+        return table.reshape(-1)
+
+    def goal_distance_transform(self):
+        """Return a (rows, columns) NumPy array with the Chebyshev distance
+        from every cell to the nearest goal cell, i.e. the least number of
+        moves needed to reach any goal. Computed for all goals at once by a
+        two-pass chessboard distance transform: a downward and an upward
+        sweep, each relaxing a row from its neighbour row and then along
+        itself, so the cost does not grow with the number of goals."""
+        rows, columns = self.rows, self.columns
+        distance = np.full((rows, columns), rows + columns, dtype=np.int64)
+        for goal_row, goal_column, _ in self.goals():
+            distance[goal_row, goal_column] = 0
+        index = np.arange(columns)
+
+        def relax(row, neighbour):
+            if neighbour is not None:
+                reach = neighbour.copy()
+                reach[1:] = np.minimum(reach[1:], neighbour[:-1])
+                reach[:-1] = np.minimum(reach[:-1], neighbour[1:])
+                np.minimum(row, reach + 1, out=row)
+            # along the row: min over j of row[j] + |i - j|, both directions
+            np.minimum(row, np.minimum.accumulate(row - index) + index, out=row)
+            backward = np.minimum.accumulate((row + index)[::-1])[::-1] - index
+            np.minimum(row, backward, out=row)
+
+        for r in range(rows):
+            relax(distance[r], distance[r - 1] if r > 0 else None)
+        for r in range(rows - 2, -1, -1):
+            relax(distance[r], distance[r + 1])
+        return distance
+
+
+def is_goal_list(goal):
+    """True if goal is a list of goals rather than a single
+    (row, column, orientation) goal."""
+    return len(goal) > 0 and isinstance(goal[0], (list, tuple))
+
+
+def expand_goal(goal):
+    """Return the states matching goal, a (row, column, orientation) goal or
+    a list of them."""
+    if is_goal_list(goal):
+        states = (state for target in goal for state in expand_goal(target))
+        return list(dict.fromkeys(states))
+    goal_row, goal_column, goal_orientation = goal
+    if goal_orientation == 8:  # 8 means orientation is not relevant
+        return [(goal_row, goal_column, o) for o in range(8)]
+    return [tuple(goal)]
+
+
+# Exact cost-to-go fields, keyed by (grid hash, goal)
+_GOAL_FIELDS = LRUCache(maxsize=16)
+
+
+def goal_cost_field(problem):
+    """Return a NumPy array, indexed by state id, with the exact cost of the
+    cheapest path from every state to problem's goal (inf if the goal cannot
+    be reached). Fields are computed by one backward Dijkstra over the whole
+    map and cached by map content and goal, so later problems on the same
+    map and goal reuse them for free."""
+    return np.frombuffer(_goal_field_values(problem))
+
+
+def _goal_field_values(problem):
+    key = (problem.map_key, tuple(problem.goals()))
+    values = _GOAL_FIELDS.get(key)
+    if values is None:
+        values = _GOAL_FIELDS[key] = _backward_dijkstra(problem)
+    return values
+
+
+def _backward_dijkstra(problem):
+    """Dijkstra from the goal states over reversed transitions: a state is
+    reached back through a rotation from either neighbouring orientation
+    (cost 1), or through a move from the cell behind it, paying the hardness
+    of the cell being entered."""
+    rows, columns = problem.rows, problem.columns
+    hardness = np.asarray(problem.grid, dtype=np.int64).ravel().tolist()
+    orientations = problem.ORIENTATIONS
+    distance = array("d", [float("inf")]) * problem.num_states
+    heap = []
+    for state in problem.goal_states():
+        state_id = problem.state_id(state)
+        distance[state_id] = 0
+        heap.append((0, state_id))
+    heapq.heapify(heap)
+
+    while heap:
+        d, state_id = heapq.heappop(heap)
+        if d > distance[state_id]:
+            continue
+        cell, orientation = divmod(state_id, 8)
+        rotated = cell * 8
+        for previous in (
+            rotated + (orientation + 1) % 8,
+            rotated + (orientation - 1) % 8,
+        ):
+            if d + 1 < distance[previous]:
+                distance[previous] = d + 1
+                heapq.heappush(heap, (d + 1, previous))
+
+        row, column = divmod(cell, columns)
+        delta_row, delta_column = orientations[orientation]
+        previous_row, previous_column = row - delta_row, column - delta_column
+        if 0 <= previous_row < rows and 0 <= previous_column < columns:
+            previous = (previous_row * columns + previous_column) * 8 + orientation
+            previous_d = d + hardness[cell]
+            if previous_d < distance[previous]:
+                distance[previous] = previous_d
+                heapq.heappush(heap, (previous_d, previous))
+    return distance
@@ -0,0 +1,266 @@
+from search import Result, astar_search, node_from_actions
+from utils import LRUCache
+import heapq
+import itertools
+
+# Abstractions keyed by (grid hash, cluster size)
+_ABSTRACTIONS = LRUCache(maxsize=8)
+
+
+class Abstraction:
+    """HPA*-style abstract graph of a drilling map. The grid is split into
+    cluster_size x cluster_size clusters and each side shared by two
+    clusters gets `transitions` evenly spaced crossing cells. A crossing is
+    an exit state (a border cell facing the neighbouring cluster, straight
+    or diagonally) linked by one move to the arrival state on the other
+    side. Intra-cluster edges are the exact cheapest paths, staying inside
+    the cluster, from each arrival to each exit of its cluster. Routes that
+    cross borders elsewhere are not represented, so results are
+    near-optimal rather than optimal."""
+
+    def __init__(self, problem, cluster_size=16, transitions=2):
+        self.problem = problem
+        self.cluster_size = cluster_size
+        self.transitions = transitions
+        self.edges = {}  # abstract state -> list of (state, cost)
+        self.arrivals, self.exits = set(), set()
+        self.expanded = 0
+        self._add_crossings()
+        self._add_intra_edges()
+
+    def cluster(self, state):
+        return (state[0] // self.cluster_size, state[1] // self.cluster_size)
+
+    def bounds(self, cluster):
+        """Return (first_row, last_row, first_column, last_column) of cluster."""
+        size = self.cluster_size
+        row, column = cluster
+        return (
+            row * size,
+            min((row + 1) * size, self.problem.rows) - 1,
+            column * size,
+            min((column + 1) * size, self.problem.columns) - 1,
+        )
+
+    def _crossing_cells(self, length):
+        """Offsets of the crossing cells along each side of `length` cells."""
+        size, count = self.cluster_size, self.transitions
+        for first in range(0, length, size):
+            side = min(first + size, length) - first
+            yield from sorted({first + (i + 1) * side // (count + 1) for i in range(count)})
+
+    def _add_crossings(self):
+        problem, size = self.problem, self.cluster_size
+        # (exit direction, side of the border the exit lies on) per border
+        vertical = [(1, 0), (2, 0), (3, 0), (5, 1), (6, 1), (7, 1)]
+        horizontal = [(3, 0), (4, 0), (5, 0), (7, 1), (0, 1), (1, 1)]
+        for border in range(size - 1, problem.columns - 1, size):
+            for row in self._crossing_cells(problem.rows):
+                for orientation, side in vertical:
+                    self._add_crossing((row, border + side, orientation))
+        for border in range(size - 1, problem.rows - 1, size):
+            for column in self._crossing_cells(problem.columns):
+                for orientation, side in horizontal:
+                    self._add_crossing((border + side, column, orientation))
+
+    def _add_crossing(self, exit_state):
+        row, column, orientation = exit_state
+        delta_row, delta_column = self.problem.ORIENTATIONS[orientation]
+        arrival = (row + delta_row, column + delta_column, orientation)
+        if not self.problem.is_valid_position(arrival[0], arrival[1]):
+            return
+        cost = self.problem.hardness(arrival[0], arrival[1])
+        self.edges.setdefault(exit_state, []).append((arrival, cost))
+        self.edges.setdefault(arrival, [])
+        self.exits.add(exit_state)
+        self.arrivals.add(arrival)
+
+    def _add_intra_edges(self):
+        exits_by_cluster = {}
+        for state in self.exits:
+            exits_by_cluster.setdefault(self.cluster(state), []).append(state)
+        for arrival in self.arrivals:
+            cluster = self.cluster(arrival)
+            exits = exits_by_cluster.get(cluster, [])
+            cost, _, _ = local_dijkstra(
+                self.problem, [arrival], self.bounds(cluster), all_targets=exits
+            )
+            self.expanded += len(cost)
+            self.edges[arrival].extend(
+                (state, cost[state])
+                for state in exits
+                if state != arrival and state in cost
+            )
+
+
+def abstraction_for(problem, cluster_size=16, transitions=2):
+    """Return the Abstraction of problem's map, building it only the first
+    time a map of that content is seen with these parameters."""
+    key = (problem.map_key, cluster_size, transitions)
+    abstraction = _ABSTRACTIONS.get(key)
+    if abstraction is None:
+        abstraction = Abstraction(problem, cluster_size, transitions)
+        _ABSTRACTIONS[key] = abstraction
+    return abstraction
+
+
+def local_dijkstra(
+    problem, sources, bounds, targets=(), all_targets=None, reverse=False
+):
+    """Dijkstra from sources over states whose cell lies inside bounds
+    (first_row, last_row, first_column, last_column). With reverse=True it
+    follows problem.predecessors, giving costs *to* the sources. Stops as
+    soon as any state in targets is settled, or once every state in
+    all_targets is. Returns (cost, parent, reached): parent maps a state to
+    (neighbour, action) towards the sources and reached is the settled
+    state of targets, or None."""
+    first_row, last_row, first_column, last_column = bounds
+    neighbours = problem.predecessors if reverse else problem.successors
+    targets = set(targets)
+    pending = None if all_targets is None else set(all_targets)
+    cost = {state: 0 for state in sources}
+    parent = {state: None for state in sources}
+    settled = set()
+    heap = [(0, state) for state in sources]
+    heapq.heapify(heap)
+    while heap:
+        g, state = heapq.heappop(heap)
+        if state in settled:
+            continue
+        settled.add(state)
+        if state in targets:
+            return cost, parent, state
+        if pending is not None:
+            pending.discard(state)
+            if not pending:
+                break
+        for action, neighbour, step_cost in neighbours(state):
+            row, column, _ = neighbour
+            if not (first_row <= row <= last_row and first_column <= column <= last_column):
+                continue
+            new_g = g + step_cost
+            if new_g < cost.get(neighbour, float("inf")):
+                cost[neighbour] = new_g
+                parent[neighbour] = (state, action)
+                heapq.heappush(heap, (new_g, neighbour))
+    return cost, parent, None
+
+
+def hierarchical_search(problem, cluster_size=16, transitions=2):
+    """Hierarchical A* (HPA*) for DrillingRobotProblem. The start and goal
+    are linked into the cached abstract graph of the map by local searches
+    inside their clusters, A* runs on the abstract graph, and only the
+    cluster segments of the chosen route are refined into concrete actions.
+    The route is near-optimal; see optimality_gap. Problems with several
+    goals are not supported."""
+    if problem.multiple_goals:
+        raise ValueError("hierarchical_search needs a single goal")
+    abstraction = abstraction_for(problem, cluster_size, transitions)
+    start, goal_states = problem.initial, problem.goal_states()
+    start_cluster = abstraction.cluster(start)
+    goal_cluster = abstraction.cluster(goal_states[0])
+    goal = "goal"  # sentinel abstract node standing for every goal state
+
+    # link the start and the goal into the abstract graph
+    start_cost, _, _ = local_dijkstra(
+        problem,
+        [start],
+        abstraction.bounds(start_cluster),
+        all_targets=[
+            state
+            for state in abstraction.exits
+            if abstraction.cluster(state) == start_cluster
+        ],
+    )
+    goal_cost, _, _ = local_dijkstra(
+        problem, goal_states, abstraction.bounds(goal_cluster), reverse=True
+    )
+    expanded = len(start_cost) + len(goal_cost)
+    start_edges = [
+        (state, start_cost[state])
+        for state in abstraction.exits
+        if abstraction.cluster(state) == start_cluster and state in start_cost
+    ]
+    if start_cluster == goal_cluster and start in goal_cost:
+        start_edges.append((goal, goal_cost[start]))
+
+    def edges(state):
+        if state == start:
+            return start_edges + abstraction.edges.get(start, [])
+        links = abstraction.edges.get(state, [])
+        if abstraction.cluster(state) == goal_cluster and state in goal_cost:
+            links = links + [(goal, goal_cost[state])]
+        return links
+
+    goal_row, goal_column, _ = goal_states[0]
+
+    def h(state):
+        if state == goal:
+            return 0
+        return problem.grid_min_hardness * max(
+            abs(goal_row - state[0]), abs(goal_column - state[1])
+        )
+
+    # A* over the abstract graph
+    g, parent, closed = {start: 0}, {start: None}, set()
+    counter = itertools.count()  # tie-breaker: the sentinel is not a tuple
+    heap = [(h(start), next(counter), start)]
+    route = None
+    while heap:
+        _, _, state = heapq.heappop(heap)
+        if state in closed:
+            continue
+        if state == goal:
+            route = [goal]
+            while parent[route[-1]] is not None:
+                route.append(parent[route[-1]])
+            route.reverse()
+            break
+        closed.add(state)
+        for neighbour, edge_cost in edges(state):
+            new_g = g[state] + edge_cost
+            if new_g < g.get(neighbour, float("inf")):
+                g[neighbour] = new_g
+                parent[neighbour] = state
+                heapq.heappush(heap, (new_g + h(neighbour), next(counter), neighbour))
+    expanded += len(closed)
+    frontier = sum(1 for state in g if state not in closed)
+    if route is None:
+        return Result(solution=None, explored=expanded, frontier=frontier)
+
+    # refine each abstract edge on the route into concrete actions
+    actions = []
+    for here, there in zip(route, route[1:]):
+        if there != goal and abstraction.cluster(here) != abstraction.cluster(there):
+            actions.append("move_forward")
+            continue
+        cluster = abstraction.cluster(here)
+        targets = goal_states if there == goal else [there]
+        cost, parent_links, reached = local_dijkstra(
+            problem, [here], abstraction.bounds(cluster), targets
+        )
+        expanded += len(cost)
+        segment = []
+        while parent_links[reached] is not None:
+            reached, action = parent_links[reached]
+            segment.append(action)
+        actions.extend(reversed(segment))
+
+    node = node_from_actions(problem, actions)
+    return Result(solution=node, explored=expanded, frontier=frontier, last_node=node)
+
+
+def optimality_gap(problem, cluster_size=16, transitions=2):
+    """Compare hierarchical_search with astar_search on problem and return
+    a dict with both costs and the relative gap (0.0 means optimal). Only
+    use it on maps where astar_search itself still fits."""
+    hierarchical = hierarchical_search(problem, cluster_size, transitions).solution
+    baseline = astar_search(problem).solution
+    if hierarchical is None or baseline is None:
+        return {"hierarchical": None, "astar": None, "gap": None}
+    gap = (hierarchical.path_cost - baseline.path_cost) / max(baseline.path_cost, 1)
+    return {
+        "hierarchical": hierarchical.path_cost,
+        "astar": baseline.path_cost,
+        "gap": gap,
+    }
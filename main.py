@@ -1,10 +1,66 @@
 from drilling_problem import DrillingRobotProblem
-from utils import parse_grid_from_file, generate_grid
-from search import breadth_first_graph_search, astar_search, depth_first_graph_search
+from utils import (
+    parse_grid_from_file,
+    generate_grid,
+    generate_grid_array,
+    load_binary_map,
+    map_argument,
+)
+from search import (
+    breadth_first_graph_search,
+    astar_search,
+    depth_first_graph_search,
+    bidirectional_astar_search,
+    SEARCHES,
+)
+import argparse
+import json
+import random
 import statistics
-
-
-def main():
+import sys
+import time
+
+
+def main(argv=None):
+    """Run the interactive menu, or with --map/--queries the batch mode:
+
+        python main.py --map example=exampleMap.txt --queries queries.jsonl
+
+    Each query is a JSON line such as {"map": "example", "start": [0, 0, 0],
+    "goal": [5, 7, 8], "algorithm": "astar"}; map may be left out when only
+    one map is given, and start and goal default to the map's own. One JSON
+    line is written per query as soon as it is solved."""
+    parser = argparse.ArgumentParser(description="Drilling Robot Search")
+    parser.add_argument(
+        "--map",
+        action="append",
+        default=[],
+        type=map_argument,
+        metavar="ID=PATH",
+        help="text (.txt) or binary map for batch mode (repeatable)",
+    )
+    parser.add_argument(
+        "--queries", help="JSON lines file of queries, or - for stdin (default)"
+    )
+    parser.add_argument("--output", help="write results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if not args.map and args.queries is None:
+        interactive_menu()
+        return 0
+    maps = dict(args.map)
+    queries = sys.stdin if args.queries in (None, "-") else open(args.queries, "r")
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        return run_batch_queries(maps, queries, output)
+    finally:
+        if queries is not sys.stdin:
+            queries.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+def interactive_menu():
     print("Drilling Robot Search")
     print("1. Run single example test (using exampleMap.txt)")
     print("2. Run single example test (using random n x n grid)")
@@ -71,13 +127,22 @@ def main():
         input_simulations = input(
             "Number of simulations per map size (default 5): "
         ).strip()
-        if input_simulations and input_simulations.isdigit():
-            run_performance_analysis(int(input_simulations))
-        elif input_simulations == "":
-            run_performance_analysis(5)
-        else:
+        if input_simulations and not input_simulations.isdigit():
+            print("Invalid input. Please enter a valid integer.")
+            return
+        input_workers = input("Number of worker processes (default 1): ").strip()
+        if input_workers and not input_workers.isdigit():
             print("Invalid input. Please enter a valid integer.")
             return
+        input_seed = input("Random seed (default: unseeded): ").strip()
+        if input_seed and not input_seed.isdigit():
+            print("Invalid input. Please enter a valid integer.")
+            return
+        run_performance_analysis(
+            int(input_simulations or 5),
+            workers=max(int(input_workers or 1), 1),
+            seed=int(input_seed) if input_seed else None,
+        )
 
     else:
         print("Invalid choice. Please enter 1 or 2.")
@@ -149,58 +214,110 @@ def test_all_algos(problem):
         print("\n" + "=" * 40 + "\n")
 
 
-def run_performance_analysis(num_simulations):
-    map_dims = [3, 5, 7, 9]
+ALGORITHMS = [
+    ("Breadth-first", breadth_first_graph_search),
+    ("Depth-first", depth_first_graph_search),
+    ("A* (h)", astar_search),
+    ("Bidir. A*", bidirectional_astar_search),
+]
+
+
+def run_performance_analysis(
+    num_simulations, workers=1, seed=None, map_dims=(3, 5, 7, 9)
+):
+    if workers > 1 and seed is None:
+        # parallel runs are always seeded so they can be reproduced
+        seed = random.randrange(2**32)
     print("\n")
     print("Comparison of Performance:")
     print("=" * 80)
-    print(f"{num_simulations} simulations for each map size: 3x3, 5x5, 7x7, 9x9")
+    sizes = ", ".join(f"{n}x{n}" for n in map_dims)
+    print(f"{num_simulations} simulations for each map size: {sizes}")
     print("Start: (0,0,0), Goal: (N-1,N-1,8) for each map")
+    if seed is not None:
+        print(f"Seed: {seed}, worker processes: {workers}")
     print("\n")
 
-    for n in map_dims:
-        results = run_simulations_for_size(n, num_simulations)
-        print_results_table(n, results)
+    if workers > 1:
+        all_results = run_simulations_parallel(
+            map_dims, num_simulations, workers, seed
+        )
+        for n in map_dims:
+            print_results_table(n, all_results[n])
+    else:
+        for n in map_dims:
+            results = run_simulations_for_size(n, num_simulations, seed)
+            print_results_table(n, results)
 
 
-def run_simulations_for_size(n, num_simulations):
-    algorithms = [
-        ("Breadth-first", breadth_first_graph_search),
-        ("Depth-first", depth_first_graph_search),
-        ("A* (h)", astar_search),
-    ]
+def simulation_seed(seed, n, simulation):
+    """Seed of one simulated map, derived only from the run seed, the map
+    size and the simulation index, so it does not depend on job order or
+    on the number of workers."""
+    return f"{seed}:{n}:{simulation}"
+
 
-    algorithm_results = {name: [] for name, _ in algorithms}
+def run_simulations_for_size(n, num_simulations, seed=None):
+    algorithm_results = {name: [] for name, _ in ALGORITHMS}
 
-    for _ in range(num_simulations):
-        grid, start, goal = generate_grid(n, n)
+    for simulation in range(num_simulations):
+        map_seed = None if seed is None else simulation_seed(seed, n, simulation)
+        grid, start, goal = generate_grid_array(n, n, seed=map_seed)
         problem = DrillingRobotProblem(grid=grid, start=start, goal=goal)
 
-        for algo_name, algo_func in algorithms:
+        for algo_name, algo_func in ALGORITHMS:
             result = algo_func(problem)
+            algorithm_results[algo_name].append(result_metrics(result))
 
-            if result and result.solution:
-                # metrics
-                d = result.solution.depth  # depth of solution
-                g = result.solution.path_cost  # cost of solution path
-                explored = result.explored  # number of explored nodes
-                frontier = result.frontier  # final frontier size
+    return algorithm_results
 
-                algorithm_results[algo_name].append(
-                    {"d": d, "g": g, "explored": explored, "frontier": frontier}
-                )
-            else:
-                # No solution found
-                algorithm_results[algo_name].append(
-                    {
-                        "d": -1,  # -1 for no solution
-                        "g": -1,
-                        "explored": result.explored if result else 0,
-                        "frontier": result.frontier if result else 0,
-                    }
-                )
 
-    return algorithm_results
+def run_simulations_parallel(map_dims, num_simulations, workers, seed):
+    """Run every (map size, simulation, algorithm) job on a pool of worker
+    processes. Each job rebuilds its map from its own seed, so the merged
+    results are identical to a serial seeded run."""
+    jobs = [
+        (n, simulation, algo_name, seed)
+        for n in map_dims
+        for simulation in range(num_simulations)
+        for algo_name, _ in ALGORITHMS
+    ]
+    all_results = {n: {name: [] for name, _ in ALGORITHMS} for n in map_dims}
+    from concurrent.futures import ProcessPoolExecutor  # only needed here
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() keeps job order, so each list stays sorted by simulation
+        for (n, _, algo_name, _), metrics in zip(
+            jobs, executor.map(run_simulation_job, jobs, chunksize=4)
+        ):
+            all_results[n][algo_name].append(metrics)
+    return all_results
+
+
+def run_simulation_job(job):
+    n, simulation, algo_name, seed = job
+    map_seed = simulation_seed(seed, n, simulation)
+    grid, start, goal = generate_grid_array(n, n, seed=map_seed)
+    problem = DrillingRobotProblem(grid=grid, start=start, goal=goal)
+    return result_metrics(dict(ALGORITHMS)[algo_name](problem))
+
+
+def result_metrics(result):
+    if result and result.solution:
+        # metrics
+        d = result.solution.depth  # depth of solution
+        g = result.solution.path_cost  # cost of solution path
+        explored = result.explored  # number of explored nodes
+        frontier = result.frontier  # final frontier size
+
+        return {"d": d, "g": g, "explored": explored, "frontier": frontier}
+    # No solution found
+    return {
+        "d": -1,  # -1 for no solution
+        "g": -1,
+        "explored": result.explored if result else 0,
+        "frontier": result.frontier if result else 0,
+    }
 
 
 def calculate_averages(results_list):
@@ -222,7 +339,7 @@ def print_results_table(n, algorithm_results):
     print(f"{'Algorithm':<15} {'d':<8} {'g':<10} {'#E':<8} {'#F':<8}")
     print(f"{'-'*60}")
 
-    for algo_name in ["Breadth-first", "Depth-first", "A* (h)"]:
+    for algo_name, _ in ALGORITHMS:
         results = algorithm_results[algo_name]
         averages = calculate_averages(results)
 
@@ -238,6 +355,64 @@ def print_results_table(n, algorithm_results):
     print("\n")
 
 
+def run_batch_queries(maps, queries, output):
+    """Answer JSON line queries from the queries file object, writing one
+    JSON line per query to output as soon as it is solved. maps maps an id
+    to a map file; each map is parsed on first use (binary maps need NumPy,
+    text maps do not). Returns 1 if any query failed, else 0."""
+    loaded = {}
+    failed = False
+    for index, line in enumerate(queries):
+        if not line.strip():
+            continue
+        record = {"index": index}
+        try:
+            query = json.loads(line)
+            record["id"] = query.get("id")
+            map_id = query.get("map")
+            if map_id is None and len(maps) == 1:
+                (map_id,) = maps
+            if map_id not in maps:
+                raise ValueError("unknown map: {}".format(map_id))
+            if map_id not in loaded:
+                path = maps[map_id]
+                loaded[map_id] = (
+                    parse_grid_from_file(path)
+                    if path.endswith(".txt")
+                    else load_binary_map(path)
+                )
+            grid, start, goal = loaded[map_id]
+            algorithm = query.get("algorithm", "astar")
+            if algorithm not in SEARCHES:
+                raise ValueError("unknown algorithm: {}".format(algorithm))
+            problem = DrillingRobotProblem(
+                grid,
+                tuple(query.get("start", start)),
+                tuple(query.get("goal", goal)),
+                heuristic=query.get("heuristic", "euclidean"),
+            )
+            started = time.perf_counter()
+            result = SEARCHES[algorithm](problem)
+            elapsed = time.perf_counter() - started
+            node = result.solution
+            record.update(
+                map=map_id,
+                algorithm=algorithm,
+                cost=None if node is None else node.path_cost,
+                depth=None if node is None else node.depth,
+                explored=result.explored,
+                frontier=result.frontier,
+                time=elapsed,
+                actions=None if node is None else node.solution(),
+            )
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as error:
+            record["error"] = "{}: {}".format(type(error).__name__, error)
+            failed = True
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+    return 1 if failed else 0
+
+
 def test_single_example(algorithm):
     grid, start, goal = parse_grid_from_file("exampleMap.txt")
     print("\n")
@@ -272,4 +447,4 @@ def test_single_example_random(n, algorithm):
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
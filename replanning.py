@@ -0,0 +1,154 @@
+from drilling_problem import DrillingRobotProblem
+from search import Result, node_from_actions
+import heapq
+
+INFINITY = float("inf")
+
+
+class IncrementalPlanner:
+    """D* Lite planner for a drilling map whose hardness values change while
+    the robot is under way. It searches backwards from the goal states, so
+    g[state] is the cost from state to the goal, and keeps g, rhs (the
+    one-step lookahead of g) and its priority queue between calls. After
+    update_cell only the states whose cost-to-goal is affected are
+    re-expanded, and move_start lets the robot advance without discarding
+    the search: the key offset km absorbs the change of heuristic origin.
+
+        planner = IncrementalPlanner(grid, start, goal)
+        result = planner.plan()
+        planner.move_start(next_state)
+        planner.update_cell(row, column, hardness)
+        result = planner.plan()
+    """
+
+    def __init__(self, grid, start, goal):
+        # own a mutable copy of the map: updates must not leak to the caller.
+        # Copy to plain ints: NumPy uint8 cells would make costs wrap at 256
+        grid = [[int(value) for value in row] for row in grid]
+        self.problem = DrillingRobotProblem(grid, start, goal)
+        self.start = self.problem.initial
+        self.km = 0
+        self.g, self.rhs = {}, {}
+        self.queue = {}  # state -> key of its live heap entry
+        self.heap = []
+        self.expanded = 0
+        self._min_hardness = self.problem.grid_min_hardness
+        self._goals = set(self.problem.goal_states())
+        for state in self._goals:
+            self.rhs[state] = 0
+            self._push(state, self._key(state))
+
+    def _h(self, first, second):
+        """Consistent lower bound on the cost between two states."""
+        return self._min_hardness * max(
+            abs(first[0] - second[0]), abs(first[1] - second[1])
+        )
+
+    def _key(self, state):
+        value = min(self.g.get(state, INFINITY), self.rhs.get(state, INFINITY))
+        return (value + self._h(self.start, state) + self.km, value)
+
+    def _push(self, state, key):
+        self.queue[state] = key
+        heapq.heappush(self.heap, (key, state))
+
+    def _top(self):
+        """Return the least live (key, state) entry, or None."""
+        heap = self.heap
+        while heap and self.queue.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)  # stale entry
+        return heap[0] if heap else None
+
+    def _update_state(self, state):
+        if state not in self._goals:
+            self.rhs[state] = min(
+                (
+                    step_cost + self.g.get(next_state, INFINITY)
+                    for _, next_state, step_cost in self.problem.successors(state)
+                ),
+                default=INFINITY,
+            )
+        if self.g.get(state, INFINITY) != self.rhs.get(state, INFINITY):
+            self._push(state, self._key(state))
+        else:
+            self.queue.pop(state, None)
+
+    def _compute_shortest_path(self):
+        g, rhs = self.g, self.rhs
+        while True:
+            top = self._top()
+            if top is None:
+                break
+            start_g = g.get(self.start, INFINITY)
+            start_rhs = rhs.get(self.start, INFINITY)
+            if top[0] >= self._key(self.start) and start_rhs == start_g:
+                break
+            old_key, state = top
+            new_key = self._key(state)
+            if old_key < new_key:
+                self._push(state, new_key)
+                continue
+            del self.queue[state]
+            self.expanded += 1
+            if g.get(state, INFINITY) > rhs.get(state, INFINITY):
+                g[state] = rhs[state]
+                for _, previous, _ in self.problem.predecessors(state):
+                    self._update_state(previous)
+            else:
+                g[state] = INFINITY
+                self._update_state(state)
+                for _, previous, _ in self.problem.predecessors(state):
+                    self._update_state(previous)
+
+    def plan(self):
+        """Bring the search up to date and return a Result whose solution is
+        the cheapest path from the current start; explored counts the states
+        expanded by this call only."""
+        expanded_before = self.expanded
+        self._compute_shortest_path()
+        explored = self.expanded - expanded_before
+        if self.g.get(self.start, INFINITY) == INFINITY:
+            return Result(solution=None, explored=explored, frontier=len(self.queue))
+
+        # follow the cheapest successor down the cost-to-goal field
+        actions, state, seen = [], self.start, {self.start}
+        while state not in self._goals:
+            _, action, state = min(
+                (step_cost + self.g.get(next_state, INFINITY), action, next_state)
+                for action, next_state, step_cost in self.problem.successors(state)
+            )
+            if state in seen:
+                raise RuntimeError("Cost-to-goal field loops at {}".format(state))
+            seen.add(state)
+            actions.append(action)
+        node = node_from_actions(self.problem, actions, self.start)
+        return Result(
+            solution=node, explored=explored, frontier=len(self.queue), last_node=node
+        )
+
+    def move_start(self, state):
+        """Move the robot to state (usually the next state of the last plan)."""
+        state = tuple(state)
+        self.km += self._h(self.start, state)
+        self.start = self.problem.initial = state
+
+    def update_cell(self, row, column, hardness):
+        """Record that cell (row, column) now has the given hardness. Only the
+        moves into that cell change cost; the next plan() repairs the states
+        whose cost-to-goal depends on them."""
+        problem = self.problem
+        if problem.hardness(row, column) == hardness:
+            return
+        problem.set_hardness(row, column, hardness)
+        if problem.grid_min_hardness < self._min_hardness:
+            # a lower bound on move costs invalidates every queued key
+            self._min_hardness = problem.grid_min_hardness
+            for state in self.queue:
+                self.queue[state] = self._key(state)
+            self.heap = [(key, state) for state, key in self.queue.items()]
+            heapq.heapify(self.heap)
+        for orientation in range(8):
+            delta_row, delta_column = problem.ORIENTATIONS[orientation]
+            previous = (row - delta_row, column - delta_column, orientation)
+            if problem.is_valid_position(previous[0], previous[1]):
+                self._update_state(previous)
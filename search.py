@@ -1,5 +1,9 @@
 from utils import *
-from collections import deque
+from array import array
+from collections import defaultdict
+import heapq
+import threading
+import time
 
 class Node:
     """A node in a search tree. Contains a pointer to the parent (the node
@@ -29,6 +33,13 @@ class Node:
 
     def expand(self, problem):
         """List the nodes reachable in one step from this node."""
+        if getattr(problem, "compiled", False):
+            # compiled problems answer with precomputed (action, state, cost)
+            # triples, skipping actions/result/path_cost dispatch
+            return [
+                Node(next_state, self, action, self.path_cost + step_cost)
+                for action, next_state, step_cost in problem.successors(self.state)
+            ]
         return [
             self.child_node(problem, action) for action in problem.actions(self.state)
         ]
@@ -73,27 +84,291 @@ class Node:
 
 
 class Result:
-    def __init__(self, solution=None, explored=0, frontier=0, last_node=None):
+    def __init__(
+        self,
+        solution=None,
+        explored=0,
+        frontier=0,
+        last_node=None,
+        bound=None,
+        stopped=None,
+    ):
         self.solution = solution
         self.explored = explored
         self.frontier = frontier
         self.last_node = last_node
+        # anytime searches: the solution costs at most bound times the optimum
+        self.bound = bound
+        # why a SearchBudget stopped the search early ("time", "expansions",
+        # "memory" or "cancelled"); None if it ran to completion
+        self.stopped = stopped
 
 
-def breadth_first_graph_search(problem):
+class SearchStats:
+    """Event counters, per-phase timers and progress reporting for a search.
+    Pass an instance as the stats argument of a search function; without
+    one a search only pays an `is not None` test per expansion. Phase times
+    (goal_test, expand, frontier, heuristic) accumulate in self.timers.
+    If progress is given it is called about every progress_interval seconds
+    with a dict holding nodes/sec, the current best f and the frontier size."""
+
+    def __init__(self, progress=None, progress_interval=1.0):
+        self.expansions = 0
+        self.goal_tests = 0
+        self.pushes = 0
+        self.pops = 0
+        self.decrease_keys = 0
+        self.heuristic_calls = 0  # heuristic actually evaluated
+        self.heuristic_lookups = 0  # heuristic asked for, cached or not
+        self.timers = defaultdict(float)
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.started = time.perf_counter()
+        self._next_report = self.started + progress_interval
+
+    @property
+    def heuristic_cache_hits(self):
+        return self.heuristic_lookups - self.heuristic_calls
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def expanded(self, frontier_size, best_f=None):
+        """Record one expansion and report progress if it is due."""
+        self.expansions += 1
+        if self.progress is not None and not self.expansions & 255:
+            now = time.perf_counter()
+            if now >= self._next_report:
+                self._next_report = now + self.progress_interval
+                self.progress(self.snapshot(frontier_size, best_f))
+
+    def snapshot(self, frontier_size=None, best_f=None):
+        elapsed = self.elapsed
+        return {
+            "elapsed": elapsed,
+            "expansions": self.expansions,
+            "nodes_per_sec": self.expansions / elapsed if elapsed else 0.0,
+            "best_f": best_f,
+            "frontier": frontier_size,
+        }
+
+    def as_dict(self):
+        """Return every counter and timer as a plain dict."""
+        return {
+            "expansions": self.expansions,
+            "goal_tests": self.goal_tests,
+            "pushes": self.pushes,
+            "pops": self.pops,
+            "decrease_keys": self.decrease_keys,
+            "heuristic_calls": self.heuristic_calls,
+            "heuristic_cache_hits": self.heuristic_cache_hits,
+            "elapsed": self.elapsed,
+            "timers": dict(self.timers),
+        }
+
+    def timed(self, phase, fn):
+        """Wrap fn so the time spent in it is added to timers[phase]."""
+        timers, clock = self.timers, time.perf_counter
+
+        def timed_fn(*args):
+            started = clock()
+            try:
+                return fn(*args)
+            finally:
+                timers[phase] += clock() - started
+
+        return timed_fn
+
+    def watch_problem(self, problem):
+        return _WatchedProblem(problem, self)
+
+    def watch_frontier(self, frontier):
+        return _WatchedFrontier(frontier, self)
+
+    def watch_heuristic(self, h):
+        """Return h memoized per state (as compact_astar_search does),
+        counting lookups, real evaluations and their time. Every node of a
+        state reached again is a cache hit."""
+        evaluate = self.timed("heuristic", h)
+        values = {}  # state -> h
+
+        def cached_h(node):
+            self.heuristic_lookups += 1
+            value = values.get(node.state)
+            if value is None:
+                self.heuristic_calls += 1
+                value = values[node.state] = evaluate(node)
+            return value
+
+        return cached_h
+
+
+class _WatchedProblem:
+    """Proxy that times and counts the problem calls made by a search."""
+
+    def __init__(self, problem, stats):
+        self._problem = problem
+        self._stats = stats
+        self._goal_test = stats.timed("goal_test", problem.goal_test)
+        for name in ("actions", "result", "path_cost", "successors", "predecessors"):
+            if hasattr(problem, name):
+                setattr(self, name, stats.timed("expand", getattr(problem, name)))
+
+    def __getattr__(self, name):
+        return getattr(self._problem, name)
+
+    def goal_test(self, state):
+        self._stats.goal_tests += 1
+        return self._goal_test(state)
+
+
+class _WatchedFrontier:
+    """Proxy that times and counts the operations on a search frontier."""
+
+    def __init__(self, frontier, stats):
+        self._frontier = frontier
+        self._stats = stats
+        timed = stats.timed
+        self._append = timed("frontier", frontier.append)
+        self._pop = timed("frontier", frontier.pop)
+        self._contains = timed("frontier", frontier.__contains__)
+
+    def append(self, item):
+        self._stats.pushes += 1
+        self._append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def pop(self):
+        self._stats.pops += 1
+        return self._pop()
+
+    def __contains__(self, item):
+        return self._contains(item)
+
+    def __getitem__(self, key):
+        return self._frontier[key]
+
+    def __delitem__(self, key):
+        self._stats.decrease_keys += 1
+        started = time.perf_counter()
+        del self._frontier[key]
+        self._stats.timers["frontier"] += time.perf_counter() - started
+
+    def __len__(self):
+        return len(self._frontier)
+
+
+class CancellationToken:
+    """Lets another thread stop a running search: pass the token in a
+    SearchBudget and call cancel(); the search returns at its next
+    expansion."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class SearchBudget:
+    """Resource limits for one search call: wall time in seconds, node
+    expansions, approximate memory in bytes (NODE_BYTES per explored or
+    frontier node) and an optional CancellationToken. Pass an instance as
+    the budget argument of a search function; when a limit is hit the
+    search returns a Result without solution whose stopped attribute says
+    why, whose last_node is the expanded node with the lowest problem.h
+    (the last expanded node if the problem has no h) and whose counts are
+    those at that point. A budget is reset each time a search starts."""
+
+    NODE_BYTES = 150  # measured on DrillingRobotProblem searches
+
+    def __init__(
+        self, time_limit=None, max_expansions=None, max_memory=None, token=None
+    ):
+        self.time_limit = time_limit
+        self.max_expansions = max_expansions
+        self.max_memory = max_memory
+        self.token = token
+        self.start()
+
+    def start(self, problem=None):
+        self.expansions = 0
+        self.best_node = None
+        self._best_h = float("inf")
+        self._h = getattr(problem, "h", None)
+        self._deadline = None
+        if self.time_limit is not None:
+            self._deadline = time.perf_counter() + self.time_limit
+
+    def expanded(self, node, frontier_size, explored_size):
+        """Record the expansion of node; return the reason to stop, if any."""
+        self.expansions += 1
+        if self._h is None:
+            self.best_node = node
+        else:
+            h = self._h(node)
+            if h < self._best_h:
+                self.best_node, self._best_h = node, h
+        if self.token is not None and self.token.cancelled:
+            return "cancelled"
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            return "time"
+        if self.max_expansions is not None and self.expansions > self.max_expansions:
+            return "expansions"
+        if (
+            self.max_memory is not None
+            and (frontier_size + explored_size) * self.NODE_BYTES > self.max_memory
+        ):
+            return "memory"
+        return None
+
+    def result(self, reason, explored, frontier):
+        """The partial Result of a search stopped for reason."""
+        return Result(
+            solution=None,
+            explored=explored,
+            frontier=frontier,
+            last_node=self.best_node,
+            stopped=reason,
+        )
+
+
+def breadth_first_graph_search(problem, stats=None, budget=None):
     """
     Search all the nodes at the present depth prior to
     moving on to the nodes at the next depth level.
+    Pass a SearchStats as stats to collect counters and timings, and a
+    SearchBudget as budget to bound the time, expansions or memory used.
     """
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+    if budget is not None:
+        budget.start(problem)
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return Result(solution=node, explored=0, frontier=0, last_node=node)
 
-    frontier = deque([node])
+    frontier = HashedQueue([node])
+    if stats is not None:
+        frontier = stats.watch_frontier(frontier)
     explored = set()
     while frontier:
-        node = frontier.popleft()
+        node = frontier.pop()
+        if budget is not None:
+            reason = budget.expanded(node, len(frontier), len(explored))
+            if reason is not None:
+                return budget.result(reason, len(explored), len(frontier))
         explored.add(node.state)
+        if stats is not None:
+            stats.expanded(len(frontier), node.depth)
         for child in node.expand(problem):
             if child.state not in explored and child not in frontier:
                 frontier.append(child)
@@ -109,15 +384,23 @@ def breadth_first_graph_search(problem):
     )
 
 
-def depth_first_graph_search(problem):
+def depth_first_graph_search(problem, stats=None, budget=None):
     """
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
     The argument frontier should be an empty queue.
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
+    Pass a SearchStats as stats to collect counters and timings, and a
+    SearchBudget as budget to bound the time, expansions or memory used.
     """
-    frontier = [Node(problem.initial)]  # Stack
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+    if budget is not None:
+        budget.start(problem)
+    frontier = HashedQueue([Node(problem.initial)], lifo=True)  # Stack
+    if stats is not None:
+        frontier = stats.watch_frontier(frontier)
 
     explored = set()
     while frontier:
@@ -129,7 +412,13 @@ def depth_first_graph_search(problem):
                 frontier=len(frontier),
                 last_node=node,
             )
+        if budget is not None:
+            reason = budget.expanded(node, len(frontier), len(explored))
+            if reason is not None:
+                return budget.result(reason, len(explored), len(frontier))
         explored.add(node.state)
+        if stats is not None:
+            stats.expanded(len(frontier), node.depth)
         frontier.extend(
             child
             for child in node.expand(problem)
@@ -140,18 +429,31 @@ def depth_first_graph_search(problem):
     )
 
 
-def best_first_graph_search(problem, f):
+def best_first_graph_search(
+    problem, f, stats=None, queue=IndexedPriorityQueue, budget=None
+):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    Pass a SearchStats as stats to collect counters and timings.
+    queue(order, f) builds the frontier; pass utils.BucketQueue (or a
+    partial of it, to set its tie-breaking) when f has integer values.
+    Pass a SearchBudget as budget to bound the time, expansions or memory
+    used."""
 
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+    if budget is not None:
+        budget.start(problem)
     f = memoize(f, "f")
     node = Node(problem.initial)
-    frontier = PriorityQueue("min", f)
+    frontier = queue("min", f)
+    if stats is not None:
+        frontier = stats.watch_frontier(frontier)
     frontier.append(node)
     frontier_size = 1
     explored = set()
@@ -165,7 +467,13 @@ def best_first_graph_search(problem, f):
                 frontier=len(frontier),
                 last_node=node,
             )
+        if budget is not None:
+            reason = budget.expanded(node, len(frontier), len(explored))
+            if reason is not None:
+                return budget.result(reason, len(explored), len(frontier))
         explored.add(node.state)
+        if stats is not None:
+            stats.expanded(len(frontier), node.f)
         for child in node.expand(problem):
             if child.state not in explored and child not in frontier:
                 frontier.append(child)
@@ -178,9 +486,663 @@ def best_first_graph_search(problem, f):
     )
 
 
-def astar_search(problem, h=None):
+def astar_search(
+    problem, h=None, stats=None, queue=IndexedPriorityQueue, budget=None
+):
     """
     A* search: f(n) = g(n) + h(n). Uses best-first graph search.
     """
-    h = memoize(h or problem.h, "h")
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n))
+    if stats is not None:
+        h = stats.watch_heuristic(h or problem.h)
+    else:
+        h = memoize(h or problem.h, "h")
+    return best_first_graph_search(
+        problem, lambda n: n.path_cost + h(n), stats, queue, budget
+    )
+
+
+def astar_bucket_search(problem, h=None, stats=None, budget=None):
+    """A* with a utils.BucketQueue frontier, for integer step costs. The
+    buckets are keyed on floor(f), so a fractional h still shares buckets
+    between nodes; the costs are optimal when h is consistent, e.g. with
+    the "chebyshev" heuristic."""
+    return astar_search(problem, h, stats, BucketQueue, budget)
+
+
+def uniform_cost_search(
+    problem, stats=None, queue=IndexedPriorityQueue, budget=None
+):
+    """Best-first graph search on the path cost g(n) alone (Dijkstra)."""
+    return best_first_graph_search(
+        problem, lambda n: n.path_cost, stats, queue, budget
+    )
+
+
+def anytime_astar_search(
+    problem, h=None, weight=5.0, weight_step=0.5, deadline=None, stats=None
+):
+    """Anytime repairing A* (ARA*). Generator yielding a Result each time a
+    weighted A* pass, f = g + weight * h, completes, starting with the
+    given weight and lowering it below the proven bound by weight_step
+    (down to 1) after every pass. Passes reuse the work of the previous
+    ones: only states whose g improved after they were expanded are
+    re-opened, and the frontier is re-keyed for the new weight. Each Result
+    carries bound, the factor by which its solution may exceed the optimal
+    cost; the generator stops once bound reaches 1. The bound assumes a
+    consistent h (e.g. the "chebyshev" heuristic). If time.perf_counter()
+    passes deadline the current pass is abandoned and, if it improved the
+    solution (or none was found yet), one last Result is yielded."""
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+        h = stats.watch_heuristic(h or problem.h)
+    else:
+        h = memoize(h or problem.h, "h")
+
+    def f(node):
+        return node.path_cost + weight * h(node)
+
+    def new_frontier(nodes):
+        queue = IndexedPriorityQueue("min", f)
+        queue.extend(nodes)
+        return queue, stats.watch_frontier(queue) if stats is not None else queue
+
+    def lower_bound():
+        # no path can be cheaper than the least g + h still to be expanded
+        pending = [entry[1] for entry in queue.index.values()]
+        pending.extend(inconsistent.values())
+        return min((node.path_cost + h(node) for node in pending), default=None)
+
+    root = Node(problem.initial)
+    best = {root.state: root}  # state -> cheapest node found so far
+    queue, frontier = new_frontier([root])
+    closed, inconsistent = set(), {}
+    incumbent = root if problem.goal_test(root.state) else None
+    expansions = 0
+    while True:
+        improved, timed_out = False, False
+        while frontier:
+            if deadline is not None and time.perf_counter() > deadline:
+                timed_out = True
+                break
+            node = frontier.pop()
+            if incumbent is not None and f(node) >= incumbent.path_cost:
+                frontier.append(node)
+                break
+            closed.add(node.state)
+            expansions += 1
+            if stats is not None:
+                stats.expanded(len(frontier), f(node))
+            for child in node.expand(problem):
+                known = best.get(child.state)
+                if known is not None and known.path_cost <= child.path_cost:
+                    continue
+                best[child.state] = child
+                if problem.goal_test(child.state):
+                    if incumbent is None or child.path_cost < incumbent.path_cost:
+                        incumbent, improved = child, True
+                if child.state in closed:
+                    inconsistent[child.state] = child
+                else:
+                    if child in frontier:
+                        del frontier[child]
+                    frontier.append(child)
+
+        if incumbent is None:
+            yield Result(solution=None, explored=expansions, frontier=len(frontier))
+            return
+        lower = lower_bound()
+        if lower is None:
+            bound = 1.0  # nothing left to expand: the solution is optimal
+        else:
+            bound = incumbent.path_cost / lower if lower > 0 else float("inf")
+            if not timed_out:
+                bound = min(bound, weight)
+            bound = max(bound, 1.0)
+        if not timed_out or improved:
+            yield Result(
+                solution=incumbent,
+                explored=expansions,
+                frontier=len(frontier),
+                last_node=incumbent,
+                bound=bound,
+            )
+        if timed_out or bound <= 1.0:
+            return
+        # a weight above the proven bound would not tighten it
+        weight = max(1.0, min(weight, bound) - weight_step)
+        reopened = {entry[1].state: entry[1] for entry in queue.index.values()}
+        reopened.update(inconsistent)
+        queue, frontier = new_frontier(reopened.values())
+        closed, inconsistent = set(), {}
+
+
+def arastar_search(
+    problem, time_limit, h=None, weight=5.0, weight_step=0.5, stats=None
+):
+    """Run anytime_astar_search for at most time_limit seconds and return
+    the last (best) Result it produced; its bound tells how close to
+    optimal the solution is."""
+    deadline = time.perf_counter() + time_limit
+    result = Result()
+    for result in anytime_astar_search(
+        problem, h, weight, weight_step, deadline, stats
+    ):
+        pass
+    return result
+
+
+def ida_star_search(problem, h=None, stats=None):
+    """Iterative deepening A*: repeated depth-first searches, each one
+    cut off at nodes whose f = g + h exceeds the current bound, the bound
+    growing to the smallest f that was cut off. Only the current path and
+    the unexplored siblings along it are kept, so memory grows with the
+    solution depth instead of the explored area; the price is that states
+    are re-expanded on every iteration and along every path that reaches
+    them (only cycles on the current path are pruned). With an admissible
+    h the solution is optimal. explored counts expansions over all
+    iterations."""
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+        h = stats.timed("heuristic", h or problem.h)
+    else:
+        h = h or problem.h
+    root = Node(problem.initial)
+    if problem.goal_test(root.state):
+        return Result(solution=root, explored=0, frontier=0, last_node=root)
+
+    bound = h(root)
+    expansions = 0
+    while True:
+        next_bound = float("inf")
+        on_path = {root.state}
+        stack = [(root, iter(root.expand(problem)))]
+        expansions += 1
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_path.discard(node.state)
+                continue
+            if child.state in on_path:
+                continue
+            f = child.path_cost + h(child)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+            if problem.goal_test(child.state):
+                return Result(
+                    solution=child,
+                    explored=expansions,
+                    frontier=len(stack),
+                    last_node=child,
+                )
+            on_path.add(child.state)
+            stack.append((child, iter(child.expand(problem))))
+            expansions += 1
+            if stats is not None:
+                stats.expanded(len(stack), bound)
+        if next_bound == float("inf"):
+            return Result(solution=None, explored=expansions, frontier=0, last_node=None)
+        bound = next_bound
+
+
+def sma_star_search(problem, max_nodes=100000, h=None, stats=None):
+    """Simplified memory-bounded A* (SMA*). Behaves like A* on a search
+    tree that never holds more than max_nodes nodes: it expands the deepest
+    node of least f, generating one successor at a time, and when memory is
+    full it forgets the shallowest leaf of highest f. The parent of a
+    forgotten node remembers its f, so the subtree is only regenerated once
+    everything else looks worse, and a node's f is backed up to the least f
+    of its successors once they have all been generated. Paths deeper than
+    max_nodes - 1 cannot be held and are treated as dead ends. The solution
+    is optimal if the optimal path fits in memory; otherwise the search
+    returns no solution. explored counts node generations."""
+    if max_nodes < 2:
+        raise ValueError("max_nodes must be at least 2.")
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+        h = stats.timed("heuristic", h or problem.h)
+    else:
+        h = h or problem.h
+    infinity = float("inf")
+    counter = 0
+    # open nodes: id -> (stamp, node); the heaps hold (key, stamp, node)
+    # entries, stale once the node's stamp changes (lazy deletion)
+    open_nodes = {}
+    best_heap, worst_heap = [], []
+    in_memory = {}  # state -> the cheapest node held for it
+
+    def key(node):
+        # the least f of what node would generate next: a new successor
+        # is worth at least node.f, a forgotten one what it was worth
+        if node.pending is None:
+            return node.f
+        return min(
+            (node.forgotten.get(action, node.f) for action in node.pending),
+            default=infinity,
+        )
+
+    def push(node):
+        nonlocal counter
+        counter += 1
+        open_nodes[id(node)] = (counter, node)
+        node_key = key(node)
+        heapq.heappush(best_heap, (node_key, -node.depth, counter, node))
+        heapq.heappush(worst_heap, (-node_key, node.depth, counter, node))
+        if len(best_heap) > 4 * max_nodes:
+            # drop the stale entries so the heaps stay within the budget
+            best_heap[:] = [entry for entry in best_heap if is_live(entry)]
+            worst_heap[:] = [entry for entry in worst_heap if is_live(entry)]
+            heapq.heapify(best_heap)
+            heapq.heapify(worst_heap)
+
+    def is_live(entry):
+        return open_nodes.get(id(entry[3]), (0,))[0] == entry[2]
+
+    def new_node(node):
+        node.pending = None  # actions left to generate, once expanded
+        node.forgotten = {}  # action -> f of a forgotten successor
+        node.children = []
+        return node
+
+    def backup(node):
+        # once every successor of a node has been valued, its f is the
+        # least f among them
+        while node is not None and node.pending is not None:
+            if any(action not in node.forgotten for action in node.pending):
+                break
+            f = min(
+                [child.f for child in node.children]
+                + [node.forgotten[action] for action in node.pending],
+                default=infinity,
+            )
+            if f == node.f:
+                break
+            node.f = f
+            if id(node) in open_nodes:
+                push(node)
+            node = node.parent
+
+    def forget_worst_leaf():
+        while worst_heap:
+            entry = heapq.heappop(worst_heap)
+            leaf = entry[3]
+            if not is_live(entry) or leaf.children or leaf.parent is None:
+                continue
+            del open_nodes[id(leaf)]
+            if in_memory.get(leaf.state) is leaf:
+                del in_memory[leaf.state]
+            parent = leaf.parent
+            parent.children.remove(leaf)
+            parent.pending.append(leaf.action)
+            parent.forgotten[leaf.action] = leaf.f
+            push(parent)
+            return
+
+    root = new_node(Node(problem.initial))
+    root.f = h(root)
+    in_memory[root.state] = root
+    push(root)
+    used = 1
+    generated = 0
+    while open_nodes:
+        while not is_live(best_heap[0]):
+            heapq.heappop(best_heap)
+        node_key, _, _, node = best_heap[0]
+        if node_key == infinity:
+            break
+        if problem.goal_test(node.state):
+            return Result(
+                solution=node,
+                explored=generated,
+                frontier=len(open_nodes),
+                last_node=node,
+            )
+        if node.pending is None:
+            node.pending = list(problem.actions(node.state))
+        if stats is not None:
+            stats.expanded(len(open_nodes), node_key)
+
+        child = None
+        while node.pending:
+            action = min(
+                node.pending, key=lambda a: node.forgotten.get(a, node.f)
+            )
+            node.pending.remove(action)
+            remembered = node.forgotten.pop(action, -infinity)
+            candidate = node.child_node(problem, action)
+            held = in_memory.get(candidate.state)
+            if held is None or candidate.path_cost < held.path_cost:
+                child = new_node(candidate)
+                child.f = max(node.f, child.path_cost + h(child), remembered)
+                in_memory[child.state] = child
+                break
+
+        if child is not None:
+            generated += 1
+            if child.depth >= max_nodes - 1 and not problem.goal_test(child.state):
+                child.f = infinity  # the path to it fills the whole memory
+            node.children.append(child)
+            used += 1
+            if used > max_nodes:
+                forget_worst_leaf()
+                used -= 1
+            push(child)
+        if node.pending or not node.children:
+            push(node)
+        else:
+            del open_nodes[id(node)]
+        backup(node)
+
+    return Result(
+        solution=None, explored=generated, frontier=len(open_nodes), last_node=None
+    )
+
+
+def compact_astar_search(problem, h=None, stats=None):
+    """A* search over integer state ids instead of Node objects. The problem
+    is compiled first (see DrillingRobotProblem.compile); g-values, parents,
+    actions and h-values then live in flat arrays indexed by state id and
+    the frontier is a heap of (f, state_id) pairs. Because state ids sort
+    like state tuples, nodes are expanded in the same order as astar_search
+    and the Result is the same; its Node path is only built at the end."""
+    problem.compile()
+    h = h or problem.h
+    num_states = problem.num_states
+    move_ids, move_costs = problem._move_ids, problem._move_costs
+    g = array("q", [0]) * num_states
+    parent = array("q", [-1]) * num_states
+    action = array("b", [-1]) * num_states
+    h_values = array("d", [-1.0]) * num_states
+    explored = bytearray(num_states)
+    explored_count = 0
+
+    if stats is not None:
+        h = stats.timed("heuristic", h)
+
+    def f(state_id):
+        h_value = h_values[state_id]
+        if h_value < 0:
+            h_value = h_values[state_id] = h(Node(problem.id_state(state_id)))
+            if stats is not None:
+                stats.heuristic_calls += 1
+        if stats is not None:
+            stats.heuristic_lookups += 1
+        return g[state_id] + h_value
+
+    start = problem.state_id(problem.initial)
+    frontier = {start: f(start)}  # state id -> f of its live heap entry
+    heap = [(frontier[start], start)]
+    frontier_size = 1
+    while frontier:
+        frontier_size = len(frontier)
+        f_value, state_id = heapq.heappop(heap)
+        if frontier.get(state_id) != f_value:
+            continue  # stale entry
+        del frontier[state_id]
+        if stats is not None:
+            stats.pops += 1
+            stats.goal_tests += 1
+        if problem.goal_test(problem.id_state(state_id)):
+            node = _node_from_ids(problem, state_id, g, parent, action)
+            return Result(
+                solution=node,
+                explored=explored_count,
+                frontier=len(frontier),
+                last_node=node,
+            )
+        explored[state_id] = 1
+        explored_count += 1
+        if stats is not None:
+            stats.expanded(len(frontier), f_value)
+        orientation = state_id & 7
+        cell = state_id - orientation
+        for k, child, step_cost in (
+            (0, cell + ((orientation - 1) & 7), 1),
+            (1, cell + ((orientation + 1) & 7), 1),
+            (2, move_ids[state_id], move_costs[state_id]),
+        ):
+            if child < 0 or explored[child]:
+                continue
+            child_g = g[state_id] + step_cost
+            if child in frontier:
+                old_g = g[child]
+                g[child] = child_g
+                child_f = f(child)
+                if child_f >= frontier[child]:
+                    g[child] = old_g
+                    continue
+                if stats is not None:
+                    stats.decrease_keys += 1
+            else:
+                g[child] = child_g
+                child_f = f(child)
+            parent[child] = state_id
+            action[child] = k
+            frontier[child] = child_f
+            heapq.heappush(heap, (child_f, child))
+            if stats is not None:
+                stats.pushes += 1
+    return Result(
+        solution=None, explored=explored_count, frontier=frontier_size, last_node=None
+    )
+
+
+def _node_from_ids(problem, state_id, g, parent, action):
+    """Rebuild the Node path ending at state_id from compact search arrays."""
+    ids = []
+    while state_id >= 0:
+        ids.append(state_id)
+        state_id = parent[state_id]
+    node = None
+    for state_id in reversed(ids):
+        node = Node(
+            problem.id_state(state_id),
+            node,
+            problem.ACTIONS[action[state_id]] if node else None,
+            g[state_id],
+        )
+    return node
+
+
+def shortest_path_tree(problem, start, goal_sets, limit=None):
+    """Uniform-cost search from start over a compiled problem, growing one
+    shortest-path tree until every goal set in goal_sets (each a list of
+    goal states) has been reached, or only the limit nearest ones if limit
+    is given. Returns one Result per goal set, whose explored/frontier
+    counts are those at the moment its first goal state was settled (goal
+    sets left unreached get a Result without solution). Answering many
+    goals from one start this way costs a single search instead of one per
+    goal. Raises ValueError if start or a goal state is off the map: packed
+    into a state id it would alias a real state."""
+    for state in [start] + [state for states in goal_sets for state in states]:
+        if not problem.is_valid_state(state):
+            raise ValueError("State off the map: {}".format(state))
+    problem.compile()
+    num_states = problem.num_states
+    move_ids, move_costs = problem._move_ids, problem._move_costs
+    g = array("q", [-1]) * num_states
+    parent = array("q", [-1]) * num_states
+    action = array("b", [-1]) * num_states
+    settled = bytearray(num_states)
+    settled_count = 0
+
+    waiting = {}  # goal state id -> indices of the goal sets it satisfies
+    for index, goal_states in enumerate(goal_sets):
+        for state in goal_states:
+            waiting.setdefault(problem.state_id(state), []).append(index)
+    results = [None] * len(goal_sets)
+    remaining = len(goal_sets) if limit is None else min(limit, len(goal_sets))
+
+    start_id = problem.state_id(start)
+    g[start_id] = 0
+    heap = [(0, start_id)]
+    while heap and remaining:
+        cost, state_id = heapq.heappop(heap)
+        if settled[state_id]:
+            continue
+        for index in waiting.pop(state_id, ()):
+            if results[index] is None:
+                node = _node_from_ids(problem, state_id, g, parent, action)
+                results[index] = Result(
+                    solution=node,
+                    explored=settled_count,
+                    frontier=len(heap),
+                    last_node=node,
+                )
+                remaining -= 1
+        settled[state_id] = 1
+        settled_count += 1
+        orientation = state_id & 7
+        cell = state_id - orientation
+        for k, child, step_cost in (
+            (0, cell + ((orientation - 1) & 7), 1),
+            (1, cell + ((orientation + 1) & 7), 1),
+            (2, move_ids[state_id], move_costs[state_id]),
+        ):
+            if child < 0 or settled[child]:
+                continue
+            child_g = cost + step_cost
+            if g[child] < 0 or child_g < g[child]:
+                g[child] = child_g
+                parent[child] = state_id
+                action[child] = k
+                heapq.heappush(heap, (child_g, child))
+
+    return [
+        result
+        or Result(solution=None, explored=settled_count, frontier=0, last_node=None)
+        for result in results
+    ]
+
+
+def nearest_goals_search(problem, k=1):
+    """Paths to the k cheapest-to-reach goals of a problem with several
+    goals (see DrillingRobotProblem), found by a single uniform-cost search
+    that stops once k goals have been reached. Returns a list of up to k
+    Results ordered by cost; result.solution.state tells which goal each
+    one reached."""
+    goal_sets = problem.goal_sets()
+    results = shortest_path_tree(problem, problem.initial, goal_sets, limit=k)
+    reached = [result for result in results if result.solution is not None]
+    return sorted(reached, key=lambda result: result.solution.path_cost)
+
+
+def bidirectional_astar_search(problem, h=None, h_reverse=None, stats=None):
+    """Bidirectional A*: a forward search from the initial state and a
+    backward search from every goal state (problem.goal_states()) over
+    problem.predecessors(), run alternately until they provably meet on an
+    optimal path. h estimates the cost to the goal and h_reverse the cost
+    from the initial state; both must be consistent. They default to
+    problem.bidirectional_heuristics(), or to zero (bidirectional Dijkstra).
+    Both directions use the average potential p = (h - h_reverse) / 2, which
+    keeps reduced edge costs non-negative in either direction, so the search
+    can stop as soon as the two smallest keys add up to the best meeting
+    cost found so far."""
+    if h is None and h_reverse is None:
+        if hasattr(problem, "bidirectional_heuristics"):
+            h, h_reverse = problem.bidirectional_heuristics()
+    h = h or (lambda state: 0)
+    h_reverse = h_reverse or (lambda state: 0)
+    if stats is not None:
+        problem = stats.watch_problem(problem)
+        h, h_reverse = stats.timed("heuristic", h), stats.timed("heuristic", h_reverse)
+
+    def p(state):
+        return (h(state) - h_reverse(state)) / 2
+
+    start = problem.initial
+    g_forward, g_backward = {start: 0}, {}
+    # parent links: state -> (neighbour towards the start / goal, action)
+    parent_forward, parent_backward = {start: None}, {}
+    closed_forward, closed_backward = set(), set()
+    heap_forward, heap_backward = [(p(start), start)], []
+    for state in problem.goal_states():
+        g_backward[state] = 0
+        parent_backward[state] = None
+        heap_backward.append((-p(state), state))
+    heapq.heapify(heap_backward)
+
+    best_cost, meeting = (0, start) if start in g_backward else (float("inf"), None)
+    while heap_forward and heap_backward:
+        for heap, closed in (
+            (heap_forward, closed_forward),
+            (heap_backward, closed_backward),
+        ):
+            while heap and heap[0][1] in closed:
+                heapq.heappop(heap)
+        if not heap_forward or not heap_backward:
+            break
+        if heap_forward[0][0] + heap_backward[0][0] >= best_cost:
+            break
+
+        forward = heap_forward[0][0] <= heap_backward[0][0]
+        if forward:
+            heap, g, other_g = heap_forward, g_forward, g_backward
+            closed, parent, sign = closed_forward, parent_forward, 1
+            neighbours = problem.successors
+        else:
+            heap, g, other_g = heap_backward, g_backward, g_forward
+            closed, parent, sign = closed_backward, parent_backward, -1
+            neighbours = problem.predecessors
+
+        key, state = heapq.heappop(heap)
+        closed.add(state)
+        if stats is not None:
+            stats.pops += 1
+            stats.expanded(len(heap_forward) + len(heap_backward), key)
+        for action, neighbour, step_cost in neighbours(state):
+            if neighbour in closed:
+                continue
+            new_g = g[state] + step_cost
+            if new_g < g.get(neighbour, float("inf")):
+                g[neighbour] = new_g
+                parent[neighbour] = (state, action)
+                heapq.heappush(heap, (new_g + sign * p(neighbour), neighbour))
+                if stats is not None:
+                    stats.pushes += 1
+                if neighbour in other_g and new_g + other_g[neighbour] < best_cost:
+                    best_cost = new_g + other_g[neighbour]
+                    meeting = neighbour
+
+    explored = len(closed_forward) + len(closed_backward)
+    frontier = sum(1 for state in g_forward if state not in closed_forward) + sum(
+        1 for state in g_backward if state not in closed_backward
+    )
+    if meeting is None:
+        return Result(solution=None, explored=explored, frontier=frontier)
+
+    actions, state = [], meeting
+    while parent_forward[state]:
+        state, action = parent_forward[state]
+        actions.append(action)
+    actions.reverse()
+    state = meeting
+    while parent_backward[state]:
+        state, action = parent_backward[state]
+        actions.append(action)
+    node = node_from_actions(problem, actions)
+    return Result(solution=node, explored=explored, frontier=frontier, last_node=node)
+
+
+def node_from_actions(problem, actions, start=None):
+    """Replay actions from start (default: problem.initial) and return the
+    final Node, with parents, path costs and depths filled in as if it had
+    been found by a search."""
+    node = Node(problem.initial if start is None else start)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
+
+# the searches by the name that batch mode, the solver service,
+# batch.solve_parallel and the benchmark accept
+SEARCHES = {
+    "bfs": breadth_first_graph_search,
+    "dfs": depth_first_graph_search,
+    "astar": astar_search,
+    "astar_bucket": astar_bucket_search,
+    "bidirectional": bidirectional_astar_search,
+    "dijkstra": uniform_cost_search,
+}
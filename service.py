@@ -0,0 +1,320 @@
+"""Long-running local solver service.
+
+Keeps maps loaded in worker processes and answers newline-delimited JSON
+requests on a TCP or Unix socket, so a query no longer pays interpreter
+start-up, imports and map parsing:
+
+    python service.py --map example=exampleMap.txt --port 8765
+
+    {"id": 1, "op": "solve", "map": "example", "start": [0, 0, 0],
+     "goal": [2, 2, 8], "algorithm": "astar"}
+    -> {"id": 1, "cost": 10, "actions": [...], "explored": 31}
+
+Other ops are {"op": "load", "map": id, "path": file} to register a text or
+binary map and {"op": "maps"} to list them. Requests arriving within
+batch_window seconds of each other are grouped per map and solved by one
+worker call; "dijkstra" queries of a group are answered together by
+batch.solve_batch. Responses carry the request id and may arrive out of
+order.
+"""
+
+from batch import solve_batch
+from drilling_problem import DrillingRobotProblem
+from utils import load_binary_map, map_argument, parse_grid_array
+from search import SEARCHES
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import json
+import os
+import socket
+
+# grids loaded by this (worker) process and their compiled problems (built
+# for the first "dijkstra" query), keyed by (map id, path) so re-registering
+# a map id under a new path loads the new file
+_GRIDS = {}
+_COMPILED = {}
+
+
+def load_map(path):
+    """Return the grid of a text map (.txt) or of a binary map."""
+    if path.endswith(".txt"):
+        return parse_grid_array(path)[0]
+    return load_binary_map(path)[0]
+
+
+def map_shape(path):
+    """(rows, columns) of a text or binary map, read without its cells."""
+    if path.endswith(".txt"):
+        tokens = []
+        with open(path) as file:
+            for line in file:
+                tokens += line.split()
+                if len(tokens) >= 2:
+                    break
+        return int(tokens[0]), int(tokens[1])
+    return load_binary_map(path)[0].shape
+
+
+def _check_state(state, shape, name, any_orientation=False):
+    """Raise ValueError unless state is a [row, column, orientation] on a
+    map of the given shape (orientation 8, any, is allowed in goals)."""
+    if not (
+        isinstance(state, list)
+        and len(state) == 3
+        and all(type(value) is int for value in state)
+    ):
+        raise ValueError("{} must be [row, column, orientation]".format(name))
+    row, column, orientation = state
+    rows, columns = shape
+    if not (0 <= row < rows and 0 <= column < columns):
+        raise ValueError("{} is off the map: {}".format(name, state))
+    if not (0 <= orientation < 8 or (any_orientation and orientation == 8)):
+        raise ValueError("{} has an invalid orientation: {}".format(name, state))
+
+
+def _load_maps(maps):
+    for map_id, path in maps.items():
+        _grid(map_id, path)
+
+
+def _grid(map_id, path):
+    key = (map_id, path)
+    if key not in _GRIDS:
+        for stale in [other for other in _GRIDS if other[0] == map_id]:
+            del _GRIDS[stale]
+            _COMPILED.pop(stale, None)
+        _GRIDS[key] = load_map(path)
+    return _GRIDS[key]
+
+
+def solve_group(map_id, path, queries):
+    """Worker side: solve (start, goal, algorithm, heuristic) queries on one
+    map and return a response dict for each."""
+    grid = _grid(map_id, path)
+
+    responses = [None] * len(queries)
+    dijkstra = [i for i, query in enumerate(queries) if query[2] == "dijkstra"]
+    if dijkstra:
+        batch = [queries[i][:2] for i in dijkstra]
+        problem = _COMPILED.get((map_id, path))
+        if problem is None:
+            problem = DrillingRobotProblem(grid, (0, 0, 0), (0, 0, 8), compiled=True)
+            _COMPILED[(map_id, path)] = problem
+        try:
+            results = solve_batch(grid, batch, problem=problem)
+        except (IndexError, TypeError, ValueError):
+            # some query is bad: answer them one by one, so only it fails
+            results = [_solve_one(grid, query, problem) for query in batch]
+        for index, result in zip(dijkstra, results):
+            responses[index] = result if isinstance(result, dict) else _response(result)
+    for index, (start, goal, algorithm, heuristic) in enumerate(queries):
+        if responses[index] is None:
+            try:
+                problem = DrillingRobotProblem(grid, start, goal, heuristic=heuristic)
+                responses[index] = _response(SEARCHES[algorithm](problem))
+            except (IndexError, TypeError, ValueError) as error:
+                responses[index] = _error(error)
+    return responses
+
+
+def _solve_one(grid, query, problem):
+    """solve_batch for a single query: its Result, or an error response."""
+    try:
+        return solve_batch(grid, [query], problem=problem)[0]
+    except (IndexError, TypeError, ValueError) as error:
+        return _error(error)
+
+
+def _error(error):
+    return {"error": "{}: {}".format(type(error).__name__, error)}
+
+
+def _response(result):
+    node = result.solution
+    return {
+        "cost": None if node is None else node.path_cost,
+        "actions": None if node is None else node.solution(),
+        "explored": result.explored,
+    }
+
+
+class SolverService:
+    """asyncio front end: reads requests, batches them and hands the
+    batches to a process pool so the event loop never runs a search."""
+
+    def __init__(self, maps, workers=None, batch_window=0.005, max_batch=64):
+        self.maps = dict(maps)  # map id -> path
+        self.shapes = {}  # path -> (rows, columns), to check requests
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.pool = ProcessPoolExecutor(
+            workers, initializer=_load_maps, initargs=(self.maps,)
+        )
+        self.queue = None
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batcher())
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self._connection, unix_path)
+        else:
+            server = await asyncio.start_server(self._connection, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+    async def _connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(request):
+            response = await self._handle(request)
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    request = {"op": "invalid", "error": str(error)}
+                task = asyncio.create_task(answer(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _handle(self, request):
+        if not isinstance(request, dict):
+            return {"error": "request must be a JSON object"}
+        response = {"id": request.get("id")}
+        op = request.get("op", "solve")
+        try:
+            if op == "solve":
+                response.update(await self._solve(request))
+            elif op == "load":
+                if not os.path.exists(request["path"]):
+                    raise ValueError("no such map file: {}".format(request["path"]))
+                self.maps[request["map"]] = request["path"]
+                response["maps"] = sorted(self.maps)
+            elif op == "maps":
+                response["maps"] = sorted(self.maps)
+            else:
+                raise ValueError(request.get("error") or "unknown op: {}".format(op))
+        except (KeyError, TypeError, ValueError) as error:
+            response["error"] = "{}: {}".format(type(error).__name__, error)
+        return response
+
+    async def _solve(self, request):
+        map_id = request["map"]
+        if map_id not in self.maps:
+            raise ValueError("unknown map: {}".format(map_id))
+        algorithm = request.get("algorithm", "astar")
+        if algorithm not in SEARCHES:
+            raise ValueError("unknown algorithm: {}".format(algorithm))
+        path = self.maps[map_id]
+        if path not in self.shapes:
+            self.shapes[path] = map_shape(path)
+        start, goal = request["start"], request["goal"]
+        _check_state(start, self.shapes[path], "start")
+        goals = goal if goal and isinstance(goal[0], list) else [goal]
+        for target in goals:
+            _check_state(target, self.shapes[path], "goal", any_orientation=True)
+        query = (
+            tuple(start),
+            tuple(goal),
+            algorithm,
+            request.get("heuristic", "euclidean"),
+        )
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((map_id, query, future))
+        return await future
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            groups = {}
+            for map_id, query, future in batch:
+                groups.setdefault(map_id, []).append((query, future))
+            for map_id, group in groups.items():
+                asyncio.create_task(self._run_group(map_id, group))
+
+    async def _run_group(self, map_id, group):
+        queries = [query for query, _ in group]
+        try:
+            responses = await asyncio.get_running_loop().run_in_executor(
+                self.pool, solve_group, map_id, self.maps[map_id], queries
+            )
+        except Exception as error:
+            message = "{}: {}".format(type(error).__name__, error)
+            responses = [{"error": message} for _ in group]
+        for (_, future), response in zip(group, responses):
+            if not future.done():
+                future.set_result(response)
+
+
+def send_requests(requests, host="127.0.0.1", port=8765, unix_path=None):
+    """Small blocking client: send a list of request dicts over one
+    connection and return the responses ordered as the requests."""
+    if unix_path is not None:
+        connection = socket.socket(socket.AF_UNIX)
+        connection.connect(unix_path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile("rwb") as stream:
+        for index, body in enumerate(requests):
+            stream.write(json.dumps(dict(body, id=index)).encode() + b"\n")
+        stream.flush()
+        responses = [json.loads(stream.readline()) for _ in requests]
+    return sorted(responses, key=lambda response: response["id"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--map",
+        action="append",
+        default=[],
+        type=map_argument,
+        metavar="ID=PATH",
+        help="map to keep loaded (repeatable)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.005,
+        help="seconds to wait for more requests to batch (default 0.005)",
+    )
+    args = parser.parse_args(argv)
+
+    maps = dict(args.map)
+    service = SolverService(maps, args.workers, args.batch_window)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
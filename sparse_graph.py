@@ -0,0 +1,95 @@
+from search import Result, node_from_actions
+from utils import LRUCache
+import numpy as np
+
+# CSR graphs keyed by grid hash
+_GRAPHS = LRUCache(maxsize=4)
+
+
+def _scipy_sparse():
+    # scipy is only needed by this engine, so import it on first use
+    try:
+        import scipy.sparse
+        import scipy.sparse.csgraph
+    except ImportError:
+        raise ImportError("The sparse graph engine requires scipy.") from None
+    return scipy.sparse
+
+
+def csr_graph(problem):
+    """Return problem's state graph as a SciPy CSR matrix over its
+    rows * columns * 8 state ids: entry [a, b] is the cost of the transition
+    from state a to state b (1 for a rotation, the hardness of the entered
+    cell for a move). Built in one vectorized pass from the compiled move
+    tables and cached by map content."""
+    key = problem.map_key
+    graph = _GRAPHS.get(key)
+    if graph is None:
+        problem.compile()
+        ids = np.arange(problem.num_states)
+        cell, orientation = ids - (ids & 7), ids & 7
+        moves = problem.move_table >= 0
+        sources = np.concatenate([ids, ids, ids[moves]])
+        targets = np.concatenate(
+            [
+                cell + ((orientation - 1) & 7),
+                cell + ((orientation + 1) & 7),
+                problem.move_table[moves],
+            ]
+        )
+        costs = np.concatenate(
+            [np.ones(2 * problem.num_states), problem.move_cost_table[moves]]
+        )
+        graph = _scipy_sparse().csr_matrix(
+            (costs.astype(np.float64), (sources, targets)),
+            shape=(problem.num_states, problem.num_states),
+        )
+        _GRAPHS[key] = graph
+    return graph
+
+
+def dijkstra_costs(problem, start=None):
+    """Run SciPy's compiled Dijkstra from start (default: problem.initial)
+    over the whole map. Returns (distances, predecessors): NumPy arrays
+    indexed by state id holding the cost from start (inf if unreachable)
+    and the previous state id on a cheapest path (negative for the start
+    and for unreachable states)."""
+    start = problem.initial if start is None else start
+    return _scipy_sparse().csgraph.dijkstra(
+        csr_graph(problem),
+        indices=problem.state_id(start),
+        return_predecessors=True,
+    )
+
+
+def path_actions(problem, predecessors, state_id):
+    """Actions along the predecessor chain that ends at state_id."""
+    ids = [state_id]
+    while predecessors[ids[-1]] >= 0:
+        ids.append(int(predecessors[ids[-1]]))
+    ids.reverse()
+    # read the action off the two state ids: the compiled tables may not
+    # exist when the graph came from the cache
+    actions = []
+    for previous, state_id in zip(ids, ids[1:]):
+        if previous >> 3 != state_id >> 3:
+            actions.append("move_forward")
+        elif state_id & 7 == (previous - 1) & 7:
+            actions.append("rotate_left")
+        else:
+            actions.append("rotate_right")
+    return actions
+
+
+def sparse_dijkstra_search(problem):
+    """Exact shortest path for problem through dijkstra_costs: the cheapest
+    goal state is picked from the full distance array and its path rebuilt
+    from the predecessors. explored is the number of reachable states."""
+    distances, predecessors = dijkstra_costs(problem)
+    explored = int(np.isfinite(distances).sum())
+    goal_ids = [problem.state_id(state) for state in problem.goal_states()]
+    goal_id = min(goal_ids, key=lambda state_id: distances[state_id])
+    if not np.isfinite(distances[goal_id]):
+        return Result(solution=None, explored=explored, frontier=0)
+    node = node_from_actions(problem, path_actions(problem, predecessors, goal_id))
+    return Result(solution=node, explored=explored, frontier=0, last_node=node)
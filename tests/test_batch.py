@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from batch import solve_batch
+from utils import parse_grid_from_file
+
+EXAMPLE_MAP = os.path.join(os.path.dirname(__file__), "..", "exampleMap.txt")
+
+
+def test_off_map_goal_is_rejected():
+    grid, _, _ = parse_grid_from_file(EXAMPLE_MAP)
+    with pytest.raises(ValueError):
+        solve_batch(grid, [((0, 0, 0), (0, 9, 8))])
+    with pytest.raises(ValueError):
+        solve_batch(grid, [((0, 0, 0), (0, 2, 9))])
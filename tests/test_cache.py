@@ -0,0 +1,25 @@
+from cache import SolutionCache
+from drilling_problem import DrillingRobotProblem
+from search import SearchBudget, astar_search
+from utils import generate_grid
+
+
+def test_budget_stopped_results_are_not_cached():
+    grid, start, goal = generate_grid(10, 10, seed=1)
+    problem = DrillingRobotProblem(grid, start, goal)
+    cache = SolutionCache()
+    partial = cache.solve(problem, astar_search, budget=SearchBudget(max_expansions=5))
+    assert partial.stopped == "expansions"
+    assert cache.solve(problem, astar_search).solution is not None
+
+
+def test_key_separates_heuristics(tmp_path):
+    grid, start, goal = generate_grid(30, 30, seed=2)
+    cache = SolutionCache(path=str(tmp_path / "solutions.sqlite"))
+    for heuristic in ("euclidean", "chebyshev"):
+        problem = DrillingRobotProblem(grid, start, goal, heuristic=heuristic)
+        expected = astar_search(problem).explored
+        assert cache.solve(problem, astar_search).explored == expected
+        cache.memory.clear()  # answer the repeat from sqlite
+        assert cache.solve(problem, astar_search).explored == expected
+    assert cache.misses == 2
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from drilling_problem import DrillingRobotProblem
+from search import astar_bucket_search, astar_search, compact_astar_search
+from utils import parse_grid_from_file
+
+EXAMPLE_MAP = os.path.join(os.path.dirname(__file__), "..", "exampleMap.txt")
+
+
+def test_off_map_states_are_rejected():
+    grid, _, _ = parse_grid_from_file(EXAMPLE_MAP)
+    with pytest.raises(ValueError):
+        DrillingRobotProblem(grid, (0, -1, 0), (2, 2, 8))
+    with pytest.raises(ValueError):
+        DrillingRobotProblem(grid, (0, 0, 8), (2, 2, 8))
+    with pytest.raises(ValueError):
+        DrillingRobotProblem(grid, (0, 0, 0), (2, 9, 8))
+
+
+def test_compiled_successors_match():
+    grid, _, _ = parse_grid_from_file(EXAMPLE_MAP)
+    plain = DrillingRobotProblem(grid, (0, 0, 0), (2, 2, 8))
+    compiled = DrillingRobotProblem(grid, (0, 0, 0), (2, 2, 8), compiled=True)
+    for row in range(plain.rows):
+        for column in range(plain.columns):
+            for orientation in range(8):
+                state = (row, column, orientation)
+                assert list(compiled.successors(state)) == list(plain.successors(state))
+    assert (
+        compact_astar_search(compiled).solution.path_cost
+        == astar_search(plain).solution.path_cost
+    )
+
+
+def test_bucket_search_is_optimal_with_chebyshev():
+    grid, _, _ = parse_grid_from_file(EXAMPLE_MAP)
+    problem = DrillingRobotProblem(grid, (0, 0, 0), (2, 2, 8), heuristic="chebyshev")
+    assert (
+        astar_bucket_search(problem).solution.path_cost
+        == astar_search(problem).solution.path_cost
+    )
@@ -0,0 +1,27 @@
+import numpy as np
+
+from drilling_problem import DrillingRobotProblem
+from replanning import IncrementalPlanner
+from search import uniform_cost_search
+from utils import generate_grid
+
+
+def test_array_and_list_grids_give_the_same_cost():
+    grid = np.full((4, 4), 100, dtype=np.uint8)
+    expected = uniform_cost_search(
+        DrillingRobotProblem(grid.tolist(), (0, 0, 3), (3, 3, 8))
+    ).solution.path_cost
+    assert expected == 300
+    for cells in (grid, grid.tolist()):
+        result = IncrementalPlanner(cells, (0, 0, 3), (3, 3, 8)).plan()
+        assert result.solution.path_cost == expected
+
+
+def test_replanning_matches_a_fresh_search():
+    grid, start, goal = generate_grid(8, 8, seed=3)
+    planner = IncrementalPlanner(np.array(grid, dtype=np.uint8), start, goal)
+    planner.plan()
+    planner.update_cell(4, 4, 9)
+    grid[4][4] = 9
+    expected = uniform_cost_search(DrillingRobotProblem(grid, start, goal))
+    assert planner.plan().solution.path_cost == expected.solution.path_cost
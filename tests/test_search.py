@@ -0,0 +1,18 @@
+import os
+
+from drilling_problem import DrillingRobotProblem
+from search import SearchStats, astar_search, compact_astar_search
+from utils import parse_grid_from_file
+
+EXAMPLE_MAP = os.path.join(os.path.dirname(__file__), "..", "exampleMap.txt")
+
+
+def test_heuristic_cache_hits_match_compact_astar():
+    grid, _, _ = parse_grid_from_file(EXAMPLE_MAP)
+    counts = []
+    for search in (astar_search, compact_astar_search):
+        stats = SearchStats()
+        search(DrillingRobotProblem(grid, (0, 0, 0), (2, 2, 8)), stats=stats)
+        counts.append((stats.heuristic_calls, stats.heuristic_cache_hits))
+    assert counts[0] == counts[1]
+    assert counts[0][1] > 0
@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+import pytest
+
+from service import SolverService, main, solve_group
+
+EXAMPLE_MAP = os.path.join(os.path.dirname(__file__), "..", "exampleMap.txt")
+
+
+def test_a_bad_query_does_not_fail_its_group():
+    queries = [
+        ((0, 0, 0), (2, 2, 8), "astar", "euclidean"),
+        ((0, 0, 0), (2, 2), "dijkstra", "euclidean"),
+        ((0, 0, 0), (0, 9, 8), "dijkstra", "euclidean"),
+        ((0, 0, 0), (2, 2, 8), "dijkstra", "euclidean"),
+    ]
+    responses = solve_group("example", EXAMPLE_MAP, queries)
+    assert "error" in responses[1] and "error" in responses[2]
+    assert responses[0]["cost"] == responses[3]["cost"] is not None
+
+
+@pytest.mark.parametrize(
+    "start, goal",
+    [([0, 0, 0], [2, 2]), ([0, 0, 0], [0, 9, 8]), ([0, 0, 8], [2, 2, 8])],
+)
+def test_malformed_states_are_rejected_before_queueing(start, goal):
+    service = SolverService({"example": EXAMPLE_MAP}, workers=1)
+    request = {"map": "example", "start": start, "goal": goal}
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(service._solve(request))
+    finally:
+        service.pool.shutdown()
+
+
+def test_malformed_map_option_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--map", "example"])
+    assert exit_info.value.code == 2
+    assert "expected ID=PATH" in capsys.readouterr().err
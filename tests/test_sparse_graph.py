@@ -0,0 +1,17 @@
+import os
+
+from drilling_problem import DrillingRobotProblem
+from search import astar_search
+from sparse_graph import sparse_dijkstra_search
+from utils import parse_grid_from_file
+
+
+def test_repeated_searches_on_a_cached_graph():
+    path = os.path.join(os.path.dirname(__file__), "..", "exampleMap.txt")
+    grid, start, goal = parse_grid_from_file(path)
+    expected = astar_search(
+        DrillingRobotProblem(grid, start, goal, heuristic="chebyshev")
+    ).solution.path_cost
+    for _ in range(2):  # the second search reuses the cached graph
+        result = sparse_dijkstra_search(DrillingRobotProblem(grid, start, goal))
+        assert result.solution.path_cost == expected
@@ -0,0 +1,11 @@
+from utils import BucketQueue
+
+
+def test_bucket_queue_keys_on_floor_of_priority():
+    queue = BucketQueue("min", lambda item: item / 4)
+    for item in [7, 1, 5, 2, 6, 3]:
+        queue.append(item)
+    assert len(queue.buckets) == 2
+    popped = [queue.pop() for _ in range(6)]
+    assert sorted(popped[:3]) == [1, 2, 3]
+    assert sorted(popped[3:]) == [5, 6, 7]
@@ -1,11 +1,37 @@
+import argparse
 import functools
+import hashlib
 import heapq
+import importlib.util
+import math
 import random
-import numpy as np
+import struct
+import sys
+from collections import OrderedDict, deque
+
+
+def lazy_import(name):
+    """Return module name, executing it only when one of its attributes is
+    first used, so importing this package stays fast for runs that never
+    need it (e.g. NumPy for plain searches on text maps)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named {!r}".format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+np = lazy_import("numpy")
 
 
 def euclidean_distance(x, y):
-    return np.sqrt(sum((_x - _y) ** 2 for _x, _y in zip(x, y)))
+    return math.sqrt(sum((_x - _y) ** 2 for _x, _y in zip(x, y)))
 
 
 def memoize(fn, slot=None, maxsize=32):
@@ -27,6 +53,46 @@ def memoize(fn, slot=None, maxsize=32):
 
     return memoized_fn
 
+class LRUCache:
+    """A dict-like cache that keeps at most maxsize entries, evicting the
+    least recently used one when full."""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used."""
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def clear(self):
+        self.data.clear()
+
+
+def grid_hash(grid):
+    """Return a content hash of a rectangular grid of hardness values, usable
+    as a cache key for anything precomputed from the map."""
+    cells = np.ascontiguousarray(grid, dtype=np.int64)
+    digest = hashlib.blake2b(cells.tobytes(), digest_size=16)
+    digest.update(np.array(cells.shape, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
 def is_in(elt, lst):
     """Return True if elt is in lst using deep comparison."""
     return any(elt == x for x in lst)
@@ -89,26 +155,351 @@ class PriorityQueue:
         heapq.heapify(self.heap)
 
 
-def generate_grid(rows, columns):
-    grid = [[random.randint(1, 9) for _ in range(columns)] for _ in range(rows)]
+class IndexedPriorityQueue(PriorityQueue):
+    """A PriorityQueue that keeps an index from each item to its live heap
+    entry, so membership, priority lookup and deletion are O(1) and
+    re-insertion with a lower priority (decrease-key) is O(log n).
+    Deleted or superseded entries stay in the heap and are skipped when
+    they reach the top (lazy deletion). Items must be hashable; items that
+    compare equal (e.g. Nodes with the same state) share one index slot."""
+
+    def __init__(self, order='min', f=lambda x: x):
+        super().__init__(order, f)
+        self.index = {}
+
+    def append(self, item):
+        """Insert item, replacing any entry already stored for it."""
+        entry = (self.f(item), item)
+        self.index[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """Pop and return the item (with min or max f(x) value)
+        depending on the order, skipping stale entries."""
+        heap, index = self.heap, self.index
+        while heap:
+            entry = heapq.heappop(heap)
+            item = entry[1]
+            if index.get(item) is entry:
+                del index[item]
+                return item
+        raise Exception('Trying to pop from empty PriorityQueue.')
+
+    def __len__(self):
+        """Return the number of live items in the queue."""
+        return len(self.index)
+
+    def __contains__(self, key):
+        """Return True if the key is in PriorityQueue."""
+        return key in self.index
+
+    def __getitem__(self, key):
+        """Returns the value associated with key in PriorityQueue.
+        Raises KeyError if key is not present."""
+        try:
+            return self.index[key][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+
+    def __delitem__(self, key):
+        """Delete key; its heap entry is discarded lazily on pop."""
+        try:
+            del self.index[key]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+        if not self.index:
+            self.heap.clear()
+
+
+class BucketQueue(IndexedPriorityQueue):
+    """An IndexedPriorityQueue for the small integer priorities of the
+    drilling problem (Dial's algorithm): items whose priorities have the
+    same floor share a bucket, so pushing and popping cost O(1) plus
+    O(log k) over the k distinct buckets in use, which a small heap of
+    bucket keys keeps ordered. Fractional priorities, such as g + h with
+    the euclidean heuristic, are only ordered by their floor: for A* with
+    integer step costs that is A* with floor(h), which stays admissible and
+    consistent whenever h is. Within a bucket items are popped LIFO (the
+    most recently pushed first) or, with lifo=False, FIFO. tie_break(item),
+    if given, splits buckets further and the smallest value is popped
+    first; e.g. lambda node: -node.path_cost prefers larger g on an f
+    plateau."""
+
+    def __init__(self, order='min', f=lambda x: x, lifo=True, tie_break=None):
+        super().__init__(order, f)
+        self.buckets = {}  # bucket key -> deque of (priority, item) entries
+        self.lifo = lifo
+        self.tie_break = tie_break
+
+    def append(self, item):
+        """Insert item, replacing any entry already stored for it."""
+        priority = self.f(item)
+        key = math.floor(priority)
+        if self.tie_break is not None:
+            key = (key, self.tie_break(item))
+        entry = (priority, item)
+        self.index[item] = entry
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = deque()
+            heapq.heappush(self.heap, key)
+        bucket.append(entry)
+
+    def pop(self):
+        """Pop and return an item of the lowest priority, skipping stale
+        entries."""
+        heap, buckets, index = self.heap, self.buckets, self.index
+        while heap:
+            bucket = buckets[heap[0]]
+            while bucket:
+                entry = bucket.pop() if self.lifo else bucket.popleft()
+                item = entry[1]
+                if index.get(item) is entry:
+                    del index[item]
+                    if not bucket:
+                        del buckets[heapq.heappop(heap)]
+                    return item
+            del buckets[heapq.heappop(heap)]
+        raise Exception('Trying to pop from empty PriorityQueue.')
+
+    def __delitem__(self, key):
+        """Delete key; its bucket entry is discarded lazily on pop."""
+        super().__delitem__(key)
+        if not self.index:
+            self.buckets.clear()
+
+
+class HashedQueue:
+    """A FIFO queue (or a LIFO stack if lifo is True) that keeps a set of
+    its items next to the ordered container, so membership tests are O(1)
+    instead of a linear scan. Items must be hashable and, as in the graph
+    searches, are assumed not to be enqueued twice."""
+
+    def __init__(self, items=(), lifo=False):
+        self.items = deque()
+        self.members = set()
+        self.lifo = lifo
+        self.extend(items)
+
+    def append(self, item):
+        """Add item at the back of the queue."""
+        self.items.append(item)
+        self.members.add(item)
+
+    def extend(self, items):
+        """Add each item in items at the back of the queue."""
+        for item in items:
+            self.append(item)
+
+    def pop(self):
+        """Remove and return the oldest item, or the newest one if lifo."""
+        item = self.items.pop() if self.lifo else self.items.popleft()
+        self.members.discard(item)
+        return item
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.members
+
+
+def generate_grid(rows, columns, seed=None):
+    """Random grid of hardness values 1-9. Uses the global random module
+    unless a seed is given, in which case the grid is reproducible."""
+    rng = random if seed is None else random.Random(seed)
+    grid = [[rng.randint(1, 9) for _ in range(columns)] for _ in range(rows)]
+    return grid, (0, 0, 0), (rows - 1, columns - 1, 8)
+
+
+# Hardness models of generate_grid_array:
+# "uniform": independent values 1-9, like generate_grid
+# "layered": strata of similar hardness running across the map, gently
+#   folded, with some per-cell noise
+# "clustered": smooth 2-D noise, i.e. patches of soft and hard rock
+# "corridors": hard rock (5-9) crossed by winding corridors of soft rock (1-2)
+TERRAINS = ("uniform", "layered", "clustered", "corridors")
+
+# maps are generated in bands of this many rows, each with its own random
+# stream, so a map is the same whether it is built whole or tile by tile
+GENERATOR_BAND_ROWS = 256
+
+
+def _seed_sequence(seed):
+    """NumPy SeedSequence for an int or string seed (fresh entropy if None)."""
+    if seed is not None and not isinstance(seed, int):
+        digest = hashlib.sha256(str(seed).encode()).digest()
+        seed = int.from_bytes(digest[:16], "little")
+    return np.random.SeedSequence(seed)
+
+
+def _smoothstep(t):
+    return t * t * (3 - 2 * t)
+
+
+def _value_noise(lattice, scale, first_row, rows, columns):
+    """Smooth noise in [0, 1) for rows first_row .. first_row + rows: the
+    random lattice values (one every scale cells) interpolated bilinearly
+    with a smoothstep fade."""
+    y = np.arange(first_row, first_row + rows) / scale
+    x = np.arange(columns) / scale
+    y0, x0 = y.astype(np.intp), x.astype(np.intp)
+    ty, tx = _smoothstep(y - y0)[:, None], _smoothstep(x - x0)[None, :]
+    top = lattice[y0][:, x0] * (1 - tx) + lattice[y0][:, x0 + 1] * tx
+    bottom = lattice[y0 + 1][:, x0] * (1 - tx) + lattice[y0 + 1][:, x0 + 1] * tx
+    return top * (1 - ty) + bottom * ty
+
+
+def iter_grid_tiles(rows, columns, seed=None, terrain="uniform", scale=32):
+    """Generate a random map band by band: yields (first_row, tile) pairs
+    where tile is a (band rows, columns) uint8 array of hardness values 1-9
+    (see TERRAINS for the models; scale is the feature size in cells of the
+    smooth ones). Only one band is held in memory at a time, and the
+    output depends only on the arguments, not on how it is consumed."""
+    if terrain not in TERRAINS:
+        raise ValueError("Unknown terrain: {}".format(terrain))
+    bands = -(-rows // GENERATOR_BAND_ROWS)
+    lattice_seeds, *band_seeds = _seed_sequence(seed).spawn(1 + bands)
+    lattice_rng = np.random.default_rng(lattice_seeds)
+    fine_scale = max(scale // 4, 1)
+    coarse = lattice_rng.random((rows // scale + 2, columns // scale + 2))
+    fine = lattice_rng.random((rows // fine_scale + 2, columns // fine_scale + 2))
+    fold = lattice_rng.random((2, columns // scale + 2))  # layered: depth offsets
+    strata = lattice_rng.random(2 * (rows + 2 * scale) // scale + 2)
+
+    for band, band_seed in enumerate(band_seeds):
+        rng = np.random.default_rng(band_seed)
+        first_row = band * GENERATOR_BAND_ROWS
+        height = min(GENERATOR_BAND_ROWS, rows - first_row)
+        if terrain == "uniform":
+            tile = rng.integers(1, 10, size=(height, columns))
+        elif terrain == "layered":
+            # the strata are a noise of the (folded) depth only
+            bend = _value_noise(fold, scale, 0, 1, columns)[0] * scale * 2
+            depth = np.arange(first_row, first_row + height)[:, None] + bend
+            layer = depth / (scale / 2)
+            index = layer.astype(np.intp)
+            fade = _smoothstep(layer - index)
+            level = strata[index] * (1 - fade) + strata[index + 1] * fade
+            tile = 1 + level * 9 + rng.integers(-1, 2, size=(height, columns))
+        elif terrain == "clustered":
+            level = 0.7 * _value_noise(coarse, scale, first_row, height, columns)
+            level += 0.3 * _value_noise(fine, fine_scale, first_row, height, columns)
+            tile = 1 + level * 9
+        else:  # corridors along an iso-line of the smooth noise
+            level = _value_noise(coarse, scale, first_row, height, columns)
+            soft = np.abs(level - 0.5) < 0.03
+            tile = np.where(
+                soft,
+                rng.integers(1, 3, size=(height, columns)),
+                rng.integers(5, 10, size=(height, columns)),
+            )
+        yield first_row, np.clip(tile, 1, 9).astype(np.uint8)
+
+
+def generate_grid_array(rows, columns, seed=None, terrain="uniform", scale=32):
+    """Vectorized, seeded version of generate_grid: returns a (rows,
+    columns) uint8 NumPy array of hardness values 1-9 drawn from a terrain
+    model (see TERRAINS and iter_grid_tiles) with the same start and goal.
+    The seed may be an int or a string; the same seed gives the same map."""
+    grid = np.empty((rows, columns), dtype=np.uint8)
+    for first_row, tile in iter_grid_tiles(rows, columns, seed, terrain, scale):
+        grid[first_row : first_row + len(tile)] = tile
     return grid, (0, 0, 0), (rows - 1, columns - 1, 8)
 
 
 def parse_grid_from_file(file_path):
-    grid = []
+    """Parse a text map (as in exampleMap.txt) into a grid of lists plus the
+    start and goal states, without NumPy; see parse_grid_array for the
+    vectorized version."""
     with open(file_path, "r") as file:
-        line = file.readline().strip()
-        rows, _ = map(int, line.split())
-        for _ in range(rows):
-            line = file.readline().strip()
-            grid.append(list(map(int, line.split())))
-
-        line = file.readline().strip()
-        start_row, start_column, start_orientation = map(int, line.split())
-        start = (start_row, start_column, start_orientation)
+        values = list(map(int, file.read().split()))
+    rows, columns = values[0], values[1]
+    cells = 2 + rows * columns
+    if len(values) != cells + 6:
+        raise ValueError(f"{file_path}: expected {rows}x{columns} cells, start and goal")
+    grid = [values[first : first + columns] for first in range(2, cells, columns)]
+    return grid, tuple(values[cells : cells + 3]), tuple(values[cells + 3 : cells + 6])
 
-        line = file.readline().strip()
-        goal_row, goal_column, goal_orientation = map(int, line.split())
-        goal = (goal_row, goal_column, goal_orientation)
 
+def parse_grid_array(file_path):
+    """Parse a text map (as in exampleMap.txt) in one pass over the whole
+    file. Returns the grid as a 2-D NumPy array of hardness values together
+    with the start and goal states."""
+    with open(file_path, "r") as file:
+        values = np.fromstring(file.read(), dtype=np.int64, sep=" ")
+    rows, columns = int(values[0]), int(values[1])
+    cells = 2 + rows * columns
+    if len(values) != cells + 6:
+        raise ValueError(f"{file_path}: expected {rows}x{columns} cells, start and goal")
+    grid = values[2:cells].reshape(rows, columns)
+    start = tuple(int(v) for v in values[cells : cells + 3])
+    goal = tuple(int(v) for v in values[cells + 3 : cells + 6])
     return grid, start, goal
+
+
+# Binary map format: a fixed little-endian header (magic, rows, columns,
+# start and goal states) followed by rows * columns uint8 hardness values.
+MAP_MAGIC = b"DRLMAP1\0"
+MAP_HEADER = struct.Struct("<8sII6i")
+
+
+def write_binary_map(file_path, grid, start, goal):
+    """Write grid, start and goal in the binary map format."""
+    cells = np.asarray(grid)
+    if cells.min() < 0 or cells.max() > 255:
+        raise ValueError("Hardness values must fit in one byte (0-255).")
+    rows, columns = cells.shape
+    with open(file_path, "wb") as file:
+        file.write(MAP_HEADER.pack(MAP_MAGIC, rows, columns, *start, *goal))
+        file.write(np.ascontiguousarray(cells, dtype=np.uint8).tobytes())
+
+
+def load_binary_map(file_path, mode="r"):
+    """Open a binary map without reading its cells: the grid is a (rows,
+    columns) uint8 np.memmap backed by the file, so loading is zero-copy and
+    pages are read on demand. Returns (grid, start, goal)."""
+    with open(file_path, "rb") as file:
+        header = file.read(MAP_HEADER.size)
+    if len(header) < MAP_HEADER.size:
+        raise ValueError(f"{file_path}: truncated map header")
+    magic, rows, columns, *states = MAP_HEADER.unpack(header)
+    if magic != MAP_MAGIC:
+        raise ValueError(f"{file_path}: not a binary drilling map")
+    grid = np.memmap(
+        file_path,
+        dtype=np.uint8,
+        mode=mode,
+        offset=MAP_HEADER.size,
+        shape=(rows, columns),
+    )
+    return grid, tuple(states[:3]), tuple(states[3:])
+
+
+def convert_text_map(text_path, binary_path):
+    """Convert a text map (as in exampleMap.txt) to the binary map format."""
+    grid, start, goal = parse_grid_array(text_path)
+    write_binary_map(binary_path, grid, start, goal)
+
+
+def map_argument(text):
+    """argparse type for an ID=PATH map option: returns (id, path), and a
+    malformed value becomes a usage error instead of a traceback."""
+    map_id, separator, path = text.partition("=")
+    if not (separator and map_id and path):
+        raise argparse.ArgumentTypeError("expected ID=PATH, got {!r}".format(text))
+    return map_id, path
+
+
+def write_generated_map(
+    file_path, rows, columns, seed=None, terrain="uniform", scale=32
+):
+    """Generate a map as generate_grid_array does and stream it to a binary
+    map file tile by tile, so maps far larger than memory can be written.
+    Returns the (start, goal) stored in the header."""
+    start, goal = (0, 0, 0), (rows - 1, columns - 1, 8)
+    with open(file_path, "wb") as file:
+        file.write(MAP_HEADER.pack(MAP_MAGIC, rows, columns, *start, *goal))
+        for _, tile in iter_grid_tiles(rows, columns, seed, terrain, scale):
+            file.write(tile.tobytes())
+    return start, goal